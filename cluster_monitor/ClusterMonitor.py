@@ -9,9 +9,18 @@ from cluster_monitor.services.RpiService import RpiService
 from cluster_monitor.services.DockerService import DockerService
 from cluster_monitor.services.RemoteService import RemoteService
 from cluster_monitor.services.SupervisorService import SupervisorService
-from cluster_monitor.renderers import RendererManager, AbstractRenderer, RENDER_ALIGN_RIGHT, RENDER_ALIGN_CENTER, NULL_COORDS, RENDER_ALIGN_LEFT
-from cluster_monitor.dto import Context
-from typing import Optional
+from cluster_monitor.services.MetricsCollectorService import MetricsCollectorService
+from cluster_monitor.renderers import RendererManager, AbstractRenderer, RENDER_ALIGN_RIGHT, RENDER_ALIGN_CENTER, NULL_COORDS, RENDER_ALIGN_LEFT, \
+    WIDGET_TEXT, WIDGET_PARAGRAPH, WIDGET_TABLE, WIDGET_SECTION, WIDGET_SUBSECTION, WIDGET_LOADING, WIDGET_SPARKLINE
+from cluster_monitor import OUTPUT_FORMAT_JSON
+from cluster_monitor.dto import Context, MetricsSnapshot, NodeStats
+from cluster_monitor.helpers.LogRingBufferHandler import LogRingBufferHandler
+from cluster_monitor.helpers.TimeSeriesStore import TimeSeriesStore, TIME_SERIES_RESOLUTION_1_MIN
+from cluster_monitor.helpers.AgentFrame import AGENT_RECORD_RPI_STATS, AGENT_RECORD_HDD_STATS, AGENT_RECORD_NODE_STATS
+from typing import Callable, Optional
+
+TREND_WINDOW_POINTS = 60
+TREND_CPU_RANGE = (0.0, 100.0)
 
 class ClusterMonitor:
     singleton = None
@@ -21,20 +30,22 @@ class ClusterMonitor:
         self._is_healthy = True
         self.context = context
         self.rpi_service = RpiService()
-        self.docker_service = DockerService()
+        self.metrics_collector_service = MetricsCollectorService(self.rpi_service)
+        self.docker_service = DockerService(self.context.docker_event_driven, self.context.docker_resync_interval_sec)
         self.supervisor_service = SupervisorService(self.context, self.docker_service, self.rpi_service)
         self.renderer_manager = RendererManager(self.context)
         self.remote_connection_service = RemoteService([], context.remote_ssh_username, context.remote_ssh_key_path)
+        self.metrics_history = TimeSeriesStore(context.history_path or None)
         ClusterMonitor.singleton = self
         self._setup_signal_handlers()
         logging.info("Cluster Monitor initialized with context info: %s", context)
 
-    def draw_rpi_stats(self, renderer: AbstractRenderer, prev_coords:tuple[int, int, int, int] = NULL_COORDS) -> tuple[int, int,int,int]:
+    def draw_rpi_stats(self, renderer: AbstractRenderer, snapshot: MetricsSnapshot, prev_coords:tuple[int, int, int, int] = NULL_COORDS) -> tuple[int, int,int,int]:
         if self.rpi_service is None:
             return prev_coords
-        coords = renderer.draw_text("RaspberryPI Stats", prev_coords, RENDER_ALIGN_CENTER)
-        coords = renderer.draw_new_subsection(coords)
-        coords = renderer.draw_text(str(self.rpi_service.render_stats()), coords)
+        coords = renderer.draw_widget("rpi_title", WIDGET_TEXT, "RaspberryPI Stats", prev_coords, RENDER_ALIGN_CENTER)
+        coords = renderer.draw_widget("rpi_subsection", WIDGET_SUBSECTION, coords)
+        coords = renderer.draw_widget("rpi_stats", WIDGET_TEXT, snapshot.rpi_stats, coords)
 
         return coords
 
@@ -43,20 +54,20 @@ class ClusterMonitor:
             return prev_coords
 
         # Draw Docker Title
-        stats_coords = renderer.draw_text("Docker Swarm Resources Stats", prev_coords, RENDER_ALIGN_CENTER)
-        coords = renderer.draw_text(f"N: {self.docker_service.count_nodes_by_state()}/{self.docker_service.count_all_nodes()} - S: #{self.docker_service.count_all_services()} - P: #{len(self.docker_service.get_open_ports())}", stats_coords)
-        coords = renderer.draw_new_subsection(coords)
-        results = self.remote_connection_service.get_async_results(command_uuid)
+        stats_coords = renderer.draw_widget("docker_title", WIDGET_TEXT, "Docker Swarm Resources Stats", prev_coords, RENDER_ALIGN_CENTER)
+        coords = renderer.draw_widget("docker_counts", WIDGET_TEXT, f"N: {self.docker_service.count_nodes_by_state()}/{self.docker_service.count_all_nodes()} - S: #{self.docker_service.count_all_services()} - P: #{len(self.docker_service.get_open_ports())}", stats_coords)
+        coords = renderer.draw_widget("docker_stats_subsection", WIDGET_SUBSECTION, coords)
+        results = self._get_remote_stats(command_uuid, NodeStats.render)
         for hostname, stats in results.items():
             if hostname != self.rpi_service.get_hostname():
-                coords = renderer.draw_text(f"{stats} - (R)", coords, RENDER_ALIGN_LEFT)
+                coords = renderer.draw_widget(f"node_stats_{hostname}", WIDGET_TEXT, f"{stats} - (R)", coords, RENDER_ALIGN_LEFT)
             else:
-                coords = renderer.draw_text(f"{stats}", coords, RENDER_ALIGN_LEFT)
+                coords = renderer.draw_widget(f"node_stats_{hostname}", WIDGET_TEXT, f"{stats}", coords, RENDER_ALIGN_LEFT)
 
-        subsection_coords = renderer.draw_new_subsection(coords)
+        subsection_coords = renderer.draw_widget("docker_ports_subsection", WIDGET_SUBSECTION, coords)
         host_ports = self.docker_service.extract_open_host_ports()
-        coords = renderer.draw_text("P: ", subsection_coords)
-        coords = renderer.draw_paragraph([f":{port}" for port in host_ports], (coords[0], coords[1], coords[2], subsection_coords[3]), "P: ")
+        coords = renderer.draw_widget("docker_ports_label", WIDGET_TEXT, "P: ", subsection_coords)
+        coords = renderer.draw_widget("docker_ports", WIDGET_PARAGRAPH, [f":{port}" for port in host_ports], (coords[0], coords[1], coords[2], subsection_coords[3]), "P: ")
 
         return coords
 
@@ -65,8 +76,8 @@ class ClusterMonitor:
             return prev_coords
 
         # Draw Docker Title
-        stats_coords = renderer.draw_text("Docker Swarm Services Stats", prev_coords, RENDER_ALIGN_CENTER)
-        coords = renderer.draw_text(f"#{self.docker_service.count_all_services()}", prev_coords, RENDER_ALIGN_RIGHT)
+        stats_coords = renderer.draw_widget("services_title", WIDGET_TEXT, "Docker Swarm Services Stats", prev_coords, RENDER_ALIGN_CENTER)
+        coords = renderer.draw_widget("services_count", WIDGET_TEXT, f"#{self.docker_service.count_all_services()}", prev_coords, RENDER_ALIGN_RIGHT)
         services = self.docker_service.extract_service_details()
 
         # Calculate visible service range
@@ -74,7 +85,9 @@ class ClusterMonitor:
         end_index = min(renderer.get_current_scroll_offset() + renderer.get_current_scroll_step(), len(services))
         visible_services = services[start_index:end_index]
 
-        coords = renderer.draw_table(
+        coords = renderer.draw_widget(
+                "services_table",
+                WIDGET_TABLE,
                 {'name': 'Name','image': 'Img', 'deployed_to': "Nodes", 'ports': 'Ports', 'replicas': 'R'},
                 [serviceStats.to_dict() for serviceStats in visible_services],
                 coords
@@ -82,22 +95,21 @@ class ClusterMonitor:
 
         return coords
 
-    def draw_docker_stats_pag_3(self, renderer: AbstractRenderer, command_uuid: Optional[str], prev_coords:tuple[int, int, int, int] = NULL_COORDS) -> tuple[int, int,int,int]:
+    def draw_docker_stats_pag_3(self, renderer: AbstractRenderer, snapshot: MetricsSnapshot, command_uuid: Optional[str], prev_coords:tuple[int, int, int, int] = NULL_COORDS) -> tuple[int, int,int,int]:
         if self.docker_service is None:
             return prev_coords
 
-        stats_coords = renderer.draw_text("Hard Disk Usages", prev_coords, RENDER_ALIGN_CENTER)
-        coords = renderer.draw_new_subsection(stats_coords)
+        stats_coords = renderer.draw_widget("disks_title", WIDGET_TEXT, "Hard Disk Usages", prev_coords, RENDER_ALIGN_CENTER)
+        coords = renderer.draw_widget("disks_subsection", WIDGET_SUBSECTION, stats_coords)
 
-        disk_usages = self.rpi_service.get_disk_usages()
-        for disk_usage in disk_usages:
-            coords = renderer.draw_text(f"{self.rpi_service.get_hostname()} - {disk_usage.render()}", coords, RENDER_ALIGN_LEFT)
+        for disk_usage in snapshot.disk_usages:
+            coords = renderer.draw_widget(f"disk_{disk_usage.path}", WIDGET_TEXT, f"{self.rpi_service.get_hostname()} - {disk_usage.render()}", coords, RENDER_ALIGN_LEFT)
 
-        results = self.remote_connection_service.get_async_results(command_uuid)
+        results = self._get_remote_stats(command_uuid, NodeStats.render_disks)
         for hostname, stats in results.items():
             if hostname == self.rpi_service.get_hostname():
                 continue
-            coords = renderer.draw_text(f"{hostname} - {stats}", coords, RENDER_ALIGN_LEFT)
+            coords = renderer.draw_widget(f"node_disk_{hostname}", WIDGET_TEXT, f"{hostname} - {stats}", coords, RENDER_ALIGN_LEFT)
 
         return stats_coords
 
@@ -106,19 +118,56 @@ class ClusterMonitor:
             return prev_coords
 
         # Draw Docker Title
-        prev_coords = renderer.draw_text("Cluster Logs", prev_coords, RENDER_ALIGN_CENTER)
-        prev_coords = renderer.draw_new_subsection(prev_coords)
-        log_lines = self.rpi_service.render_logs(
-            self.rpi_service.get_lines_from_file('/var/log/cluster_monitor.log')
-        )
+        prev_coords = renderer.draw_widget("logs_title", WIDGET_TEXT, "Cluster Logs", prev_coords, RENDER_ALIGN_CENTER)
+        prev_coords = renderer.draw_widget("logs_subsection", WIDGET_SUBSECTION, prev_coords)
+        if LogRingBufferHandler.singleton is not None:
+            log_lines = LogRingBufferHandler.singleton.get_lines()
+        else:
+            log_lines = self.rpi_service.render_logs(
+                self.rpi_service.get_lines_from_file('/var/log/cluster_monitor.log')
+            )
 
-        for line in log_lines:
-            prev_coords = renderer.draw_text(line, prev_coords, RENDER_ALIGN_LEFT)
+        for i, line in enumerate(log_lines):
+            prev_coords = renderer.draw_widget(f"log_line_{i}", WIDGET_TEXT, line, prev_coords, RENDER_ALIGN_LEFT)
 
         return prev_coords
 
-    def _is_busy(self) -> bool:
-        if not self.rpi_service.is_cluster_hat_on():
+    def draw_docker_stats_pag_5(self, renderer: AbstractRenderer, command_uuid: Optional[str], prev_coords:tuple[int, int, int, int] = NULL_COORDS) -> tuple[int, int,int,int]:
+        if self.docker_service is None:
+            return prev_coords
+
+        stats_coords = renderer.draw_widget("trends_title", WIDGET_TEXT, f"Node Trends - last {TREND_WINDOW_POINTS} min", prev_coords, RENDER_ALIGN_CENTER)
+        coords = renderer.draw_widget("trends_subsection", WIDGET_SUBSECTION, stats_coords)
+        if self.context.remote_ssh_output_format != OUTPUT_FORMAT_JSON:
+            return renderer.draw_widget("trends_unavailable", WIDGET_TEXT, "Trends need the json output format", coords, RENDER_ALIGN_LEFT)
+
+        # Points are (min, max) tuples so the widgets can compare them and fold them into bins
+        for hostname in self.remote_connection_service.get_async_node_stats(command_uuid).keys():
+            cpu_points = tuple((point[1], point[2]) for point in self.metrics_history.get_window(f"{hostname}.cpu", TREND_WINDOW_POINTS, TIME_SERIES_RESOLUTION_1_MIN))
+            temperature_points = tuple((point[1], point[2]) for point in self.metrics_history.get_window(f"{hostname}.temperature", TREND_WINDOW_POINTS, TIME_SERIES_RESOLUTION_1_MIN))
+            cpu_coords = renderer.draw_widget(f"node_cpu_trend_{hostname}", WIDGET_SPARKLINE, f"{hostname} C", cpu_points, coords, TREND_CPU_RANGE, True, 0.5)
+            coords = renderer.draw_widget(f"node_temperature_trend_{hostname}", WIDGET_SPARKLINE, "T", temperature_points, (cpu_coords[0], cpu_coords[1], cpu_coords[2], coords[3]), None, False)
+
+        return stats_coords
+
+    def _get_remote_stats(self, command_uuid: Optional[str], render: Callable[[NodeStats], str]) -> dict[str, str]:
+        if self.context.remote_ssh_output_format != OUTPUT_FORMAT_JSON:
+            return self.remote_connection_service.get_async_results(command_uuid)
+        return {hostname: render(stats) for hostname, stats in self.remote_connection_service.get_async_node_stats(command_uuid).items()}
+
+    def _record_history(self, command_uuid: Optional[str]) -> None:
+        if self.context.remote_ssh_output_format != OUTPUT_FORMAT_JSON:
+            return
+        # Samples already stored are skipped by their timestamp, so results can be read on every frame
+        for hostname, stats in self.remote_connection_service.get_async_node_stats(command_uuid).items():
+            self.metrics_history.append(f"{hostname}.cpu", stats.cpu_usage, stats.timestamp)
+            self.metrics_history.append(f"{hostname}.ram", stats.ram_usage, stats.timestamp)
+            self.metrics_history.append(f"{hostname}.disk", stats.disk_usage, stats.timestamp)
+            if stats.temperature is not None:
+                self.metrics_history.append(f"{hostname}.temperature", stats.temperature, stats.timestamp)
+
+    def _is_busy(self, snapshot: MetricsSnapshot) -> bool:
+        if not snapshot.cluster_hat_status.is_on:
             return False
         if self.docker_service.is_busy():
             return True
@@ -126,25 +175,52 @@ class ClusterMonitor:
             return True
         return False
 
-    def is_healthy(self) -> bool:
+    def is_healthy(self, snapshot: MetricsSnapshot) -> bool:
 
-        are_all_nodes_healthy = self.rpi_service.get_clusterhat_status().active_node_count == len(self.remote_connection_service.clients)
+        are_all_nodes_healthy = snapshot.cluster_hat_status.active_node_count == len(self.remote_connection_service.clients)
 
         return self._is_healthy and \
             self.docker_service.is_healthy() and \
             self.remote_connection_service.is_healthy() and \
             self.supervisor_service.is_healthy() and \
-            self.rpi_service.is_healthy() and are_all_nodes_healthy
+            self.metrics_collector_service.is_healthy() and \
+            self.rpi_service.is_healthy(snapshot.cluster_hat_status) and are_all_nodes_healthy
 
     def start(self) -> None:
         logging.info("Cluster Monitor display. Press Ctrl+C to exit.")
         renderer = self.renderer_manager.get_renderer()
-        rpi_stats_command_uuid = self.remote_connection_service.attach_command(self.context.remote_ssh_rpi_status_command)
-        rpi_hdd_command_uuid = self.remote_connection_service.attach_command(self.context.remote_ssh_rpi_hdd_status_command)
-        self.remote_connection_service.execute_on_all_async(rpi_stats_command_uuid)
-        self.remote_connection_service.execute_on_all_async(rpi_hdd_command_uuid)
+        if self.context.remote_ssh_output_format == OUTPUT_FORMAT_JSON:
+            # One structured record per node carries both the stats and the disk usages
+            if self.context.remote_ssh_agent_command:
+                rpi_stats_command_uuid = self.remote_connection_service.attach_agent(self.context.remote_ssh_agent_command,
+                                                                                     [AGENT_RECORD_NODE_STATS])[AGENT_RECORD_NODE_STATS]
+            else:
+                rpi_stats_command_uuid = self.remote_connection_service.attach_command(self.context.remote_ssh_rpi_status_command,
+                                                                                       interval_sec=self.context.remote_ssh_rpi_status_interval_sec)
+                self.remote_connection_service.execute_on_all_async(rpi_stats_command_uuid)
+            rpi_hdd_command_uuid = rpi_stats_command_uuid
+        elif self.context.remote_ssh_agent_command:
+            record_uuids = self.remote_connection_service.attach_agent(self.context.remote_ssh_agent_command,
+                                                                        [AGENT_RECORD_RPI_STATS, AGENT_RECORD_HDD_STATS])
+            rpi_stats_command_uuid = record_uuids[AGENT_RECORD_RPI_STATS]
+            rpi_hdd_command_uuid = record_uuids[AGENT_RECORD_HDD_STATS]
+        else:
+            rpi_stats_command_uuid = self.remote_connection_service.attach_command(self.context.remote_ssh_rpi_status_command,
+                                                                                   interval_sec=self.context.remote_ssh_rpi_status_interval_sec)
+            rpi_hdd_command_uuid = self.remote_connection_service.attach_command(self.context.remote_ssh_rpi_hdd_status_command,
+                                                                                 interval_sec=self.context.remote_ssh_rpi_hdd_status_interval_sec)
+            self.remote_connection_service.execute_on_all_async(rpi_stats_command_uuid)
+            self.remote_connection_service.execute_on_all_async(rpi_hdd_command_uuid)
         current_drawing_page = renderer.get_controller().get_current_page()
 
+        try:
+            self._run_display_loop(renderer, current_drawing_page, rpi_stats_command_uuid, rpi_hdd_command_uuid)
+        finally:
+            # Closed here rather than from the signal handler, which may interrupt the loop inside the store
+            self.metrics_history.__close__()
+
+    def _run_display_loop(self, renderer: AbstractRenderer, current_drawing_page: int,
+                          rpi_stats_command_uuid: Optional[str], rpi_hdd_command_uuid: Optional[str]) -> None:
         while self.is_running:
             try:
                 logging.debug("Updating display...")
@@ -154,33 +230,38 @@ class ClusterMonitor:
                     time.sleep(0.5)
                     continue
 
-                if not self.is_healthy():
+                snapshot = self.metrics_collector_service.get_snapshot()
+                if not self.is_healthy(snapshot):
                     self.rpi_service.set_cluster_hat_alert(True)
                 else:
                     self.rpi_service.set_cluster_hat_alert(False)
 
-                renderer.refresh()
+                if not self.context.renderer_retained_mode:
+                    renderer.refresh()
                 self.remote_connection_service.update_hostnames(self.docker_service.extract_node_hostnames())
+                self._record_history(rpi_stats_command_uuid)
 
-                renderer.draw_text(self.rpi_service.get_current_time() + renderer.draw_pagination(), NULL_COORDS, RENDER_ALIGN_RIGHT)
-                coords = renderer.draw_text(self.rpi_service.render_cluster_hat_status())
-                coords = renderer.draw_new_section(coords)
+                renderer.draw_widget("clock", WIDGET_TEXT, self.rpi_service.get_current_time() + renderer.draw_pagination(), NULL_COORDS, RENDER_ALIGN_RIGHT)
+                coords = renderer.draw_widget("cluster_hat_status", WIDGET_TEXT, self.rpi_service.format_cluster_hat_status(snapshot.cluster_hat_status, snapshot.is_fan_on, snapshot.ip_address))
+                coords = renderer.draw_widget("header_section", WIDGET_SECTION, coords)
 
-                if self._is_busy():
+                if self._is_busy(snapshot):
                     logging.info("Docker or remote connection busy. Waiting for completion...")
-                    renderer.draw_loading(coords)
+                    renderer.draw_widget("loading", WIDGET_LOADING, coords)
                 else:
-                    if not self.rpi_service.is_cluster_hat_on():
-                        self.draw_rpi_stats(renderer, coords)
+                    if not snapshot.cluster_hat_status.is_on:
+                        self.draw_rpi_stats(renderer, snapshot, coords)
                     else:
                         if current_drawing_page == 1:
                             self.draw_docker_stats_pag_1(renderer, rpi_stats_command_uuid, coords)
                         elif current_drawing_page == 2:
                             self.draw_docker_stats_pag_2(renderer, coords)
                         elif current_drawing_page == 3:
-                            self.draw_docker_stats_pag_3(renderer, rpi_hdd_command_uuid, coords)
+                            self.draw_docker_stats_pag_3(renderer, snapshot, rpi_hdd_command_uuid, coords)
                         elif current_drawing_page == 4:
                             self.draw_docker_stats_pag_4(renderer, coords)
+                        elif current_drawing_page == 5:
+                            self.draw_docker_stats_pag_5(renderer, rpi_stats_command_uuid, coords)
                         else:
                             logging.warning(f"Invalid drawing page: {current_drawing_page}")
 
@@ -202,6 +283,7 @@ class ClusterMonitor:
         self.rpi_service.set_cluster_hat_alert(False)
         self.renderer_manager.__close__()
         self.supervisor_service.__close__()
+        self.metrics_collector_service.__close__()
         if self.rpi_service.is_cluster_hat_on():
             self.docker_service.__close__()
             self.remote_connection_service.__close__()
@@ -2,25 +2,67 @@
 # -*- coding:utf-8 -*-
 
 import logging
+import os
+import sys
+import tempfile
+import time
 
+from cluster_monitor import OUTPUT_FORMAT_JSON
 from cluster_monitor.dto import Context
+from cluster_monitor.helpers.AgentFrame import AgentFrame, AGENT_RECORD_RPI_STATS, AGENT_RECORD_HDD_STATS, AGENT_RECORD_NODE_STATS
 from cluster_monitor.services.RpiService import RpiService
 
+# Keeps the previous /proc/stat counters between invocations, on tmpfs when available.
+# Each -mc run measures the CPU load since the previous run, minus its own startup, but the SSH session
+# that starts it still counts as load. The agent (-mc-agent) samples in one long running process and avoids that.
+CPU_SAMPLER_STATE_PATH = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                                      'cluster_monitor_cpu_stat')
+
 class MonitorClient:
     singleton = None
 
     def __init__(self):
-        self.rpi_service = RpiService()
+        self.rpi_service = RpiService(CPU_SAMPLER_STATE_PATH)
         logging.info("Cluster Client initialized")
 
     def render_rpi_stats(self):
         print(self.rpi_service.render_stats())
 
+    def render_node_stats(self):
+        # Stats and disk usages in one JSON line, the manager formats them for display
+        print(self.rpi_service.get_node_stats(['/']).to_json())
+
     def render_disk_stats(self):
-        for disk_usage in self.rpi_service.get_disk_usages(['/']):
-            print(disk_usage.render())
+        print(self._format_disk_stats())
+
+    def _format_disk_stats(self) -> str:
+        return "\n".join(disk_usage.render() for disk_usage in self.rpi_service.get_disk_usages(['/']))
+
+    def run_agent(self, interval_sec: int, output_format: str):
+        logging.info("Cluster Client agent streaming %s stats every %d seconds", output_format, interval_sec)
+        output = sys.stdout.buffer
+        try:
+            while True:
+                if output_format == OUTPUT_FORMAT_JSON:
+                    output.write(AgentFrame.encode(AGENT_RECORD_NODE_STATS, self.rpi_service.get_node_stats(['/']).to_json()))
+                else:
+                    output.write(AgentFrame.encode(AGENT_RECORD_RPI_STATS, self.rpi_service.render_stats()))
+                    output.write(AgentFrame.encode(AGENT_RECORD_HDD_STATS, self._format_disk_stats()))
+                output.flush()
+                time.sleep(interval_sec)
+        except (BrokenPipeError, KeyboardInterrupt):
+            # The manager closed the channel, nothing is reading our records anymore
+            logging.info("Cluster Client agent stream closed")
 
     def render(self, context: Context):
+        if context.is_monitor_agent:
+            self.run_agent(context.monitor_agent_interval_sec, context.monitor_output_format)
+            return
+
+        if context.monitor_output_format == OUTPUT_FORMAT_JSON:
+            self.render_node_stats()
+            return
+
         if context.show_hdd_stats:
             self.render_disk_stats()
             return
@@ -11,6 +11,9 @@ RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__
 RENDERER_TYPE_EPAPER = 'epaper'
 RENDERER_TYPE_CONSOLE = 'console'
 ARG_RENDERER_CHOICES = [RENDERER_TYPE_EPAPER, RENDERER_TYPE_CONSOLE]
-ARG_PAGE_CHOICES = ['1', '2', '3', '4']
+ARG_PAGE_CHOICES = ['1', '2', '3', '4', '5']
 ARG_BOOL_CHOICES = ['1', '0']
+OUTPUT_FORMAT_TEXT = 'text'
+OUTPUT_FORMAT_JSON = 'json'
+ARG_OUTPUT_FORMAT_CHOICES = [OUTPUT_FORMAT_TEXT, OUTPUT_FORMAT_JSON]
 CONFIG_FILE_PATHS = ["config.yaml", "config.yml", "config.local.yaml", "config.local.yml"]
\ No newline at end of file
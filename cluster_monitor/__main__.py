@@ -2,26 +2,38 @@
 # -*- coding:utf-8 -*-
 import argparse
 from cluster_monitor.dto import Context
-from cluster_monitor import ARG_RENDERER_CHOICES, ARG_PAGE_CHOICES, RENDERER_TYPE_EPAPER
+from cluster_monitor import ARG_RENDERER_CHOICES, ARG_PAGE_CHOICES, RENDERER_TYPE_EPAPER, ARG_OUTPUT_FORMAT_CHOICES, \
+    OUTPUT_FORMAT_TEXT
 
 def _console_parse_arguments(context: Context) -> None:
     parser = argparse.ArgumentParser(description='Server Status Display')
     parser.add_argument('-r', '--renderer', choices=ARG_RENDERER_CHOICES, default=RENDERER_TYPE_EPAPER,
                         help='Choose renderer type: console or epaper')
     parser.add_argument('-p', '--page', choices=ARG_PAGE_CHOICES, default=1,
-                        help='Choose default page nr: 1, 2, 3, 4')
+                        help='Choose default page nr: 1, 2, 3, 4, 5')
     parser.add_argument('-mc', '--monitor-client', action='store_true', default=False,
                         help='Choose if you execute this as a monitor client')
     parser.add_argument('-mc-hdd', '--monitor-client-hdd-stats', action='store_true', default=False,
                         help='Choose if you execute this as a monitor client')
+    parser.add_argument('-mc-agent', '--monitor-client-agent', action='store_true', default=False,
+                        help='Keep running as a monitor client and stream stats records to stdout')
+    parser.add_argument('--agent-interval', type=int, default=2,
+                        help='Seconds between stats records sent by the monitor client agent')
+    parser.add_argument('-o', '--output', choices=ARG_OUTPUT_FORMAT_CHOICES, default=OUTPUT_FORMAT_TEXT,
+                        help='Choose monitor client output format: text or json')
 
     args = parser.parse_args()
     context.default_page = int(args.page)
     context.render_type = args.renderer
     context.is_monitor_client = args.monitor_client
+    context.monitor_output_format = args.output
     if args.monitor_client_hdd_stats:
         context.is_monitor_client = True
         context.show_hdd_stats = True
+    if args.monitor_client_agent:
+        context.is_monitor_client = True
+        context.is_monitor_agent = True
+        context.monitor_agent_interval_sec = args.agent_interval
 
 if __name__ == "__main__":
     context = Context(1, RENDERER_TYPE_EPAPER)
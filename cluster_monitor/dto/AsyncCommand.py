@@ -38,7 +38,8 @@ class AsyncCommand:
         for command in self.values():
             if key not in command.results:
                 continue
-            command.results.pop(key)
+            # Replaced rather than changed in place, readers may be iterating the current results
+            command.results = {host: result for host, result in command.results.items() if host != key}
 
     def __close__(self) -> None:
         logging.debug("Closing async commands update threads, stopping...")
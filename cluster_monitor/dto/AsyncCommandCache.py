@@ -10,4 +10,6 @@ class AsyncCommandCache:
     command: str
     running: bool
     results: dict[str, str]
-    thread: threading.Thread
\ No newline at end of file
+    thread: threading.Thread
+    interval_sec: float = 2
+    next_update_time: float = 0.0
\ No newline at end of file
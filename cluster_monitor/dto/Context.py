@@ -1,7 +1,7 @@
 #!/usr/bin/python
 # -*- coding:utf-8 -*-
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 @dataclass
 class Context:
@@ -11,11 +11,23 @@ class Context:
     remote_ssh_key_path: str = ''
     remote_ssh_rpi_status_command: str = ''
     remote_ssh_rpi_hdd_status_command: str = ''
+    remote_ssh_rpi_status_interval_sec: int = 2
+    remote_ssh_rpi_hdd_status_interval_sec: int = 2
+    remote_ssh_agent_command: str = ''
+    remote_ssh_output_format: str = 'text'
     is_monitor_client: bool = False
+    is_monitor_agent: bool = False
+    monitor_agent_interval_sec: int = 2
+    monitor_output_format: str = 'text'
     show_hdd_stats: bool = False
     renderer_init_interval_sec: int = 2 * 60
     display_update_interval_sec: int = 5
+    renderer_retained_mode: bool = True
+    renderer_font_sizes: list[int] = field(default_factory=list)
     docker_node_down_threshold_sec: int = 60
+    docker_event_driven: bool = False
+    docker_resync_interval_sec: int = 60
+    history_path: str = ''
 
     def __str__(self):
         return (f"Context(default_page={self.default_page}, "
@@ -24,8 +36,20 @@ class Context:
                 f"remote_ssh_key_path={self.remote_ssh_key_path}, "
                 f"remote_ssh_rpi_status_command={self.remote_ssh_rpi_status_command}, "
                 f"remote_ssh_rpi_hdd_status_command={self.remote_ssh_rpi_hdd_status_command}, "
+                f"remote_ssh_rpi_status_interval_sec={self.remote_ssh_rpi_status_interval_sec}, "
+                f"remote_ssh_rpi_hdd_status_interval_sec={self.remote_ssh_rpi_hdd_status_interval_sec}, "
+                f"remote_ssh_agent_command={self.remote_ssh_agent_command}, "
+                f"remote_ssh_output_format={self.remote_ssh_output_format}, "
                 f"is_monitor_client={self.is_monitor_client}, "
+                f"is_monitor_agent={self.is_monitor_agent}, "
+                f"monitor_agent_interval_sec={self.monitor_agent_interval_sec}, "
+                f"monitor_output_format={self.monitor_output_format}, "
                 f"show_hdd_stats={self.show_hdd_stats}, "
                 f"renderer_init_interval_sec={self.renderer_init_interval_sec}, "
                 f"display_update_interval_sec={self.display_update_interval_sec}, "
-                f"docker_node_down_threshold_sec={self.docker_node_down_threshold_sec})")
+                f"renderer_retained_mode={self.renderer_retained_mode}, "
+                f"renderer_font_sizes={self.renderer_font_sizes}, "
+                f"docker_node_down_threshold_sec={self.docker_node_down_threshold_sec}, "
+                f"docker_event_driven={self.docker_event_driven}, "
+                f"docker_resync_interval_sec={self.docker_resync_interval_sec}, "
+                f"history_path={self.history_path})")
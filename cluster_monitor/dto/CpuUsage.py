@@ -0,0 +1,16 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+from dataclasses import dataclass
+
+@dataclass
+class CpuUsage:
+    name: str
+    usage_percentage: float
+    user_percentage: float
+    system_percentage: float
+    iowait_percentage: float
+    steal_percentage: float
+
+    def render(self) -> str:
+        return f"{self.name}: {self.usage_percentage:3.0f}% (io: {self.iowait_percentage:3.1f}% st: {self.steal_percentage:3.1f}%)"
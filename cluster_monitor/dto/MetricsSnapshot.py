@@ -0,0 +1,15 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+from dataclasses import dataclass
+from cluster_monitor.dto.ClusterHatStatus import ClusterHatStatus
+from cluster_monitor.dto.DiskUsageInfo import DiskUsageInfo
+
+@dataclass(frozen=True)
+class MetricsSnapshot:
+    cluster_hat_status: ClusterHatStatus
+    is_fan_on: bool
+    ip_address: str
+    rpi_stats: str
+    disk_usages: tuple[DiskUsageInfo, ...]
+    timestamp: float
@@ -0,0 +1,34 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import json
+from dataclasses import dataclass, asdict
+from typing import Optional
+from cluster_monitor.dto.DiskUsageInfo import DiskUsageInfo
+
+@dataclass
+class NodeStats:
+    hostname: str
+    cpu_usage: float
+    ram_usage: float
+    disk_usage: float
+    temperature: Optional[float]
+    is_fan_on: bool
+    disk_usages: list[DiskUsageInfo]
+    timestamp: float
+
+    def render(self) -> str:
+        temperature = f"{self.temperature:4.1f}°C" if self.temperature is not None else "N/A"
+        return f"{self.hostname.upper()} - C: {self.cpu_usage:3.0f}% M: {self.ram_usage:3.0f}% H: {self.disk_usage:3.0f}% T: {temperature}{' [F]' if self.is_fan_on else ''}"
+
+    def render_disks(self) -> str:
+        return "\n".join(disk_usage.render() for disk_usage in self.disk_usages)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, line: str) -> 'NodeStats':
+        data = json.loads(line)
+        data['disk_usages'] = [DiskUsageInfo(**disk_usage) for disk_usage in data.get('disk_usages', [])]
+        return cls(**data)
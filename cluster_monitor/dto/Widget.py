@@ -0,0 +1,18 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+@dataclass
+class Widget:
+    name: str
+    kind: str
+    args: Optional[tuple]
+    coords: Any
+    footprint: list[tuple[int, int, int, int]] = field(default_factory=list)
+    frame: int = 0
+
+    def intersects(self, area: tuple[int, int, int, int]) -> bool:
+        x1, y1, x2, y2 = area
+        return any(fx1 < x2 and x1 < fx2 and fy1 < y2 and y1 < fy2 for fx1, fy1, fx2, fy2 in self.footprint)
@@ -4,9 +4,9 @@
 __version__ = "1.0.0"
 __author__ = "Ionut-Alexandru Banica"
 
-from cluster_monitor.dto.Context import Context
-from cluster_monitor.dto.ClusterHatStatus import ClusterHatStatus
-from cluster_monitor.dto.AsyncCommandCache import AsyncCommandCache
-from cluster_monitor.dto.AsyncCommand import AsyncCommand
-from cluster_monitor.dto.DockerStatus import DockerStatus
-from cluster_monitor.dto.DiskUsageInfo import DiskUsageInfo
\ No newline at end of file
+from cluster_monitor.helpers.LazyPackage import LazyPackage
+
+# DTOs are imported on first use, the monitor client only needs a few of them
+__all__ = ["Context", "ClusterHatStatus", "AsyncCommandCache", "AsyncCommand", "DockerStatus", "DiskUsageInfo", "Widget",
+           "MetricsSnapshot", "CpuUsage", "NodeStats"]
+LazyPackage.install(__name__)
@@ -0,0 +1,29 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+from typing import Any, Optional
+
+AGENT_RECORD_RPI_STATS = 'rpi_stats'
+AGENT_RECORD_HDD_STATS = 'hdd_stats'
+AGENT_RECORD_NODE_STATS = 'node_stats'
+
+class AgentFrame:
+    # Frame layout: "<kind> <payload length in bytes>\n" followed by the UTF-8 payload
+    @staticmethod
+    def encode(kind: str, payload: str) -> bytes:
+        data = payload.encode('utf-8')
+        return f"{kind} {len(data)}\n".encode('utf-8') + data
+
+    @staticmethod
+    def read(stream: Any) -> Optional[tuple[str, str]]:
+        header = stream.readline()
+        if not header:
+            return None
+        if isinstance(header, bytes):
+            header = header.decode('utf-8')
+
+        kind, length = header.split()
+        data = stream.read(int(length))
+        if len(data) < int(length):
+            return None
+        return kind, data.decode('utf-8')
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from typing import Optional
+from cluster_monitor.dto import CpuUsage
+
+PROC_STAT_PATH = '/proc/stat'
+PROC_SELF_STAT_PATH = '/proc/self/stat'
+# /proc/self/stat columns after the command name: utime and stime of this process, in clock ticks
+PROC_SELF_STAT_UTIME, PROC_SELF_STAT_STIME = 11, 12
+# A persisted sample younger than this would mostly measure the client starting up, measure a short window instead
+CPU_SAMPLER_MIN_WINDOW_S = 1.0
+CPU_SAMPLER_SHORT_WINDOW_S = 0.25
+# /proc/stat columns: user nice system idle iowait irq softirq steal (guest time is already part of user)
+PROC_STAT_USER, PROC_STAT_NICE, PROC_STAT_SYSTEM, PROC_STAT_IDLE, PROC_STAT_IOWAIT, \
+    PROC_STAT_IRQ, PROC_STAT_SOFTIRQ, PROC_STAT_STEAL = range(8)
+
+class CpuSampler:
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.previous_counters = None
+
+    def _read_counters(self, lines: list[str]) -> dict[str, list[int]]:
+        counters = {}
+        for line in lines:
+            if not line.startswith('cpu'):
+                continue
+            fields = line.split()
+            counters[fields[0]] = (list(map(int, fields[1:9])) + [0] * 8)[:8]
+        return counters
+
+    def _load_previous_counters(self) -> dict[str, list[int]]:
+        if self.previous_counters is not None:
+            return self.previous_counters
+        if self.state_path is None:
+            return {}
+        try:
+            with open(self.state_path, 'r') as state_file:
+                return self._read_counters(state_file.readlines())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.debug(f"Error reading CPU sampler state {self.state_path}: {e}")
+            return {}
+
+    def _store_counters(self, lines: list[str]) -> None:
+        if self.state_path is None:
+            return
+        # Other client processes may read the state at any time, replace it in one step instead of rewriting it in place
+        state_dir, state_name = os.path.split(self.state_path)
+        temp_path = None
+        try:
+            temp_fd, temp_path = tempfile.mkstemp(prefix=f"{state_name}.", dir=state_dir or None)
+            with os.fdopen(temp_fd, 'w') as state_file:
+                state_file.writelines(lines)
+            os.replace(temp_path, self.state_path)
+        except Exception as e:
+            logging.debug(f"Error writing CPU sampler state {self.state_path}: {e}")
+            if temp_path is not None and os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    @staticmethod
+    def _compute_usage(name: str, current: list[int], previous: list[int]) -> CpuUsage:
+        deltas = [max(current_value - previous_value, 0) for current_value, previous_value in zip(current, previous)]
+        total = sum(deltas)
+        if total <= 0:
+            return CpuUsage(name, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+        def percentage(value: int) -> float:
+            return round(value / total * 100, 1)
+
+        busy = total - deltas[PROC_STAT_IDLE] - deltas[PROC_STAT_IOWAIT]
+        return CpuUsage(
+            name=name,
+            usage_percentage=percentage(busy),
+            user_percentage=percentage(deltas[PROC_STAT_USER] + deltas[PROC_STAT_NICE]),
+            system_percentage=percentage(deltas[PROC_STAT_SYSTEM] + deltas[PROC_STAT_IRQ] + deltas[PROC_STAT_SOFTIRQ]),
+            iowait_percentage=percentage(deltas[PROC_STAT_IOWAIT]),
+            steal_percentage=percentage(deltas[PROC_STAT_STEAL])
+        )
+
+    @staticmethod
+    def _read_stat_lines() -> list[str]:
+        with open(PROC_STAT_PATH, 'r') as stat_file:
+            return [line for line in stat_file.readlines() if line.startswith('cpu')]
+
+    @staticmethod
+    def _get_window_s(counters: dict[str, list[int]], previous_counters: dict[str, list[int]]) -> float:
+        nr_cores = max(len([name for name in counters if name != 'cpu']), 1)
+        ticks = sum(counters['cpu']) - sum(previous_counters.get('cpu', [0] * 8))
+        return ticks / nr_cores / os.sysconf('SC_CLK_TCK')
+
+    @staticmethod
+    def _exclude_own_cpu_time(previous_counters: dict[str, list[int]]) -> dict[str, list[int]]:
+        # The persisted window spans this process's interpreter startup, which is not load of the node.
+        # Its CPU time is counted as if it had already passed at the previous sample.
+        try:
+            with open(PROC_SELF_STAT_PATH, 'r') as stat_file:
+                fields = stat_file.read().rsplit(')', 1)[1].split()
+        except Exception as e:
+            logging.debug(f"Error reading own CPU time: {e}")
+            return previous_counters
+
+        aggregate = list(previous_counters['cpu'])
+        aggregate[PROC_STAT_USER] += int(fields[PROC_SELF_STAT_UTIME])
+        aggregate[PROC_STAT_SYSTEM] += int(fields[PROC_SELF_STAT_STIME])
+        return {**previous_counters, 'cpu': aggregate}
+
+    def sample(self) -> dict[str, CpuUsage]:
+        """Returns the utilization since the previous sample, keyed by 'cpu' (aggregate) and 'cpuN' (per core).
+        Without a previous sample the values are averages since boot."""
+        lines = self._read_stat_lines()
+
+        with self.lock:
+            counters = self._read_counters(lines)
+            is_persisted = self.previous_counters is None
+            previous_counters = self._load_previous_counters()
+            if is_persisted and 'cpu' in previous_counters and 'cpu' in counters:
+                if self._get_window_s(counters, previous_counters) < CPU_SAMPLER_MIN_WINDOW_S:
+                    time.sleep(CPU_SAMPLER_SHORT_WINDOW_S)
+                    previous_counters = counters
+                    lines = self._read_stat_lines()
+                    counters = self._read_counters(lines)
+                else:
+                    previous_counters = self._exclude_own_cpu_time(previous_counters)
+            self.previous_counters = counters
+            self._store_counters(lines)
+
+        return {name: self._compute_usage(name, values, previous_counters.get(name, [0] * 8))
+                for name, values in counters.items()}
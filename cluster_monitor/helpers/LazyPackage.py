@@ -0,0 +1,26 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import importlib
+import sys
+import types
+
+class LazyPackage(types.ModuleType):
+    """Package whose classes are imported on first access, each from the submodule of the same name."""
+
+    def __getattr__(self, name: str):
+        if name not in self.__dict__.get('__all__', ()):
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        importlib.import_module(f"{self.__name__}.{name}")
+        return self.__dict__[name]
+
+    def __setattr__(self, name: str, value) -> None:
+        # Importing a submodule binds it on the package under its name, which is also the class name: keep the class
+        if isinstance(value, types.ModuleType) and value.__name__ == f"{self.__name__}.{name}" and \
+                name in self.__dict__.get('__all__', ()):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+    @staticmethod
+    def install(package_name: str) -> None:
+        sys.modules[package_name].__class__ = LazyPackage
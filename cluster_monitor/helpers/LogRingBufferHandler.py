@@ -0,0 +1,37 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import logging
+import time
+
+from collections import deque
+
+LOG_RING_BUFFER_SIZE = 50
+LOG_RING_BUFFER_TIME_FORMAT = "%H:%M"
+
+class LogRingBufferHandler(logging.Handler):
+    singleton = None
+
+    def __init__(self, capacity: int = LOG_RING_BUFFER_SIZE):
+        super().__init__()
+        self.lines = deque(maxlen=capacity)
+        LogRingBufferHandler.singleton = self
+
+    def format(self, record: logging.LogRecord) -> str:
+        # Same compact form the logs page shows: "HH:MM [L] message"
+        message = record.getMessage().splitlines()
+        return (f"{time.strftime(LOG_RING_BUFFER_TIME_FORMAT, time.localtime(record.created))} "
+                f"[{record.levelname[0]}] {message[0] if message else ''}")
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def get_lines(self, nr_lines: int = 10) -> list[str]:
+        self.acquire()
+        try:
+            return list(self.lines)[-nr_lines:]
+        finally:
+            self.release()
@@ -0,0 +1,59 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import os
+import threading
+
+from collections import deque
+
+LOG_TAIL_BLOCK_SIZE = 4096
+LOG_TAIL_MAX_LINE_SIZE = 64 * 1024
+
+class LogTailReader:
+    def __init__(self, filename: str, nr_lines: int = 10):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.lines = deque(maxlen=nr_lines)
+        self.inode = None
+        self.offset = 0
+        self.partial_line = b''
+
+    def _read_last_lines(self, file, size: int) -> None:
+        # Walk backwards from EOF one block at a time until enough complete lines are buffered
+        position = size
+        data = b''
+        while position > 0 and data.count(b'\n') <= self.lines.maxlen and len(data) < LOG_TAIL_MAX_LINE_SIZE * self.lines.maxlen:
+            block_size = min(LOG_TAIL_BLOCK_SIZE, position)
+            position -= block_size
+            file.seek(position)
+            data = file.read(block_size) + data
+
+        lines = data.split(b'\n')
+        if position > 0:
+            # The first line is most likely cut in the middle
+            lines = lines[1:]
+        self.partial_line = lines.pop()
+        self.lines.clear()
+        self.lines.extend(line.decode('utf-8', errors='replace').rstrip() for line in lines)
+        self.offset = size
+
+    def _read_appended_lines(self, file, size: int) -> None:
+        file.seek(self.offset)
+        data = self.partial_line + file.read(size - self.offset)
+        self.offset = size
+
+        lines = data.split(b'\n')
+        self.partial_line = lines.pop()[-LOG_TAIL_MAX_LINE_SIZE:]
+        self.lines.extend(line.decode('utf-8', errors='replace').rstrip() for line in lines[-self.lines.maxlen:])
+
+    def read_lines(self) -> list[str]:
+        with self.lock:
+            with open(self.filename, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if stat.st_ino != self.inode or stat.st_size < self.offset:
+                    # First read, or the log was rotated or truncated, start over from the end of the file
+                    self.inode = stat.st_ino
+                    self._read_last_lines(file, stat.st_size)
+                elif stat.st_size > self.offset:
+                    self._read_appended_lines(file, stat.st_size)
+            return list(self.lines)
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from typing import Optional
+
+TIME_SERIES_MAGIC = b'CMTS0001'
+TIME_SERIES_NAME_SIZE = 64
+TIME_SERIES_MAX_METRICS = 32
+# A full store reuses the slot of a metric that got no sample for this long, e.g. of a node that left the cluster
+TIME_SERIES_STALE_S = 60 * 60
+# (resolution in seconds, number of points), resolution 0 keeps every raw sample
+TIME_SERIES_TIERS = ((0, 360), (60, 720), (15 * 60, 672))
+TIME_SERIES_RESOLUTION_RAW = 0
+TIME_SERIES_RESOLUTION_1_MIN = 60
+TIME_SERIES_RESOLUTION_15_MIN = 15 * 60
+# Every tier stores these columns, for raw samples min == max == sum and count == 1
+COLUMN_TIME, COLUMN_MIN, COLUMN_MAX, COLUMN_SUM, COLUMN_COUNT = range(5)
+COLUMN_COUNT_TOTAL = 5
+
+class TimeSeriesStore:
+    def __init__(self, path: Optional[str] = None, max_metrics: int = TIME_SERIES_MAX_METRICS,
+                 tiers: tuple[tuple[int, int], ...] = TIME_SERIES_TIERS):
+        self.path = path
+        self.max_metrics = max_metrics
+        self.tiers = tuple(tiers)
+        self.lock = threading.Lock()
+        self.file = None
+        self.closed = False
+        self.dropped_metrics = set()
+
+        layout = [max_metrics, len(self.tiers)] + [value for tier in self.tiers for value in tier]
+        self.header = TIME_SERIES_MAGIC + struct.pack(f"<{len(layout)}q", *layout)
+        self.tier_offsets = [sum(capacity for _, capacity in self.tiers[:tier]) for tier in range(len(self.tiers))]
+        self.metric_size = sum(capacity for _, capacity in self.tiers) * COLUMN_COUNT_TOTAL
+        self.names_offset = len(self.header)
+        self.state_offset = self.names_offset + max_metrics * TIME_SERIES_NAME_SIZE
+        self.data_offset = self.state_offset + max_metrics * len(self.tiers) * 2 * 8
+        size = self.data_offset + max_metrics * self.metric_size * 8
+
+        self.buffer = self._open_buffer(size) if path else bytearray(size)
+        if self.buffer[:len(self.header)] != self.header:
+            # New or incompatible history, start from an empty store
+            self.buffer[:size] = bytes(size)
+            self.buffer[:len(self.header)] = self.header
+
+        # Columns are typed views straight into the buffer, nothing is parsed on startup
+        self.view = memoryview(self.buffer)
+        self.names = self.view[self.names_offset:self.state_offset]
+        self.state = self.view[self.state_offset:self.data_offset].cast('q')
+        self.data = self.view[self.data_offset:size].cast('d')
+        self.slots = {}
+        for slot in range(max_metrics):
+            name = bytes(self.names[slot * TIME_SERIES_NAME_SIZE:(slot + 1) * TIME_SERIES_NAME_SIZE]).rstrip(b'\0')
+            if name:
+                self.slots[name] = slot
+
+    def _open_buffer(self, size: int) -> mmap.mmap:
+        self.file = open(self.path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size != size:
+            self.file.truncate(size)
+        return mmap.mmap(self.file.fileno(), size)
+
+    @staticmethod
+    def _get_name(metric: str) -> bytes:
+        name = metric.encode('utf-8')
+        if len(name) <= TIME_SERIES_NAME_SIZE:
+            return name
+        # Too long for the name field: keep a prefix and tell names apart by a digest of the full name
+        digest = hashlib.blake2b(name, digest_size=8).hexdigest().encode('ascii')
+        return name[:TIME_SERIES_NAME_SIZE - len(digest) - 1] + b'#' + digest
+
+    def _get_free_slot(self, timestamp: float) -> Optional[int]:
+        used_slots = set(self.slots.values())
+        for slot in range(self.max_metrics):
+            if slot not in used_slots:
+                return slot
+
+        name, slot = min(self.slots.items(), key=lambda item: self._get_last_time(item[1]))
+        if timestamp - self._get_last_time(slot) < TIME_SERIES_STALE_S:
+            return None
+        logging.info("Time series store is full, reusing the slot of stale metric %s", name.decode('utf-8', errors='replace'))
+        del self.slots[name]
+        self.names[slot * TIME_SERIES_NAME_SIZE:(slot + 1) * TIME_SERIES_NAME_SIZE] = bytes(TIME_SERIES_NAME_SIZE)
+        for tier in range(len(self.tiers)):
+            state = (slot * len(self.tiers) + tier) * 2
+            self.state[state] = self.state[state + 1] = 0
+        return slot
+
+    def _get_slot(self, metric: str, timestamp: Optional[float] = None) -> Optional[int]:
+        name = self._get_name(metric)
+        slot = self.slots.get(name)
+        if slot is not None or timestamp is None:
+            return slot
+
+        slot = self._get_free_slot(timestamp)
+        if slot is None:
+            if metric not in self.dropped_metrics:
+                self.dropped_metrics.add(metric)
+                logging.warning("Time series store is full, dropping metric %s", metric)
+            return None
+        self.dropped_metrics.discard(metric)
+        self.names[slot * TIME_SERIES_NAME_SIZE:slot * TIME_SERIES_NAME_SIZE + len(name)] = name
+        self.slots[name] = slot
+        return slot
+
+    def _get_tier(self, resolution_s: int) -> int:
+        for tier, (resolution, _) in enumerate(self.tiers):
+            if resolution == resolution_s:
+                return tier
+        raise ValueError(f"No time series tier with a resolution of {resolution_s} seconds")
+
+    def _get_base(self, slot: int, tier: int) -> int:
+        return slot * self.metric_size + self.tier_offsets[tier] * COLUMN_COUNT_TOTAL
+
+    def _get_last_time(self, slot: int) -> float:
+        tier = self._get_tier(TIME_SERIES_RESOLUTION_RAW)
+        capacity = self.tiers[tier][1]
+        state = (slot * len(self.tiers) + tier) * 2
+        if not self.state[state + 1]:
+            return float('-inf')
+        return self.data[self._get_base(slot, tier) + COLUMN_TIME * capacity + (self.state[state] - 1) % capacity]
+
+    def append(self, metric: str, value: float, timestamp: Optional[float] = None) -> bool:
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            if self.closed:
+                return False
+            slot = self._get_slot(metric, timestamp)
+            if slot is None or timestamp <= self._get_last_time(slot):
+                # Dropped, or already recorded, e.g. the same remote result read on two frames
+                return False
+
+            for tier, (resolution, capacity) in enumerate(self.tiers):
+                base = self._get_base(slot, tier)
+                state = (slot * len(self.tiers) + tier) * 2
+                head, count = self.state[state], self.state[state + 1]
+                last = (head - 1) % capacity
+                last_time = self.data[base + COLUMN_TIME * capacity + last] if count else None
+                bucket_time = timestamp - timestamp % resolution if resolution else timestamp
+
+                if last_time is not None and bucket_time < last_time:
+                    continue
+                if last_time is not None and bucket_time == last_time:
+                    self.data[base + COLUMN_MIN * capacity + last] = min(self.data[base + COLUMN_MIN * capacity + last], value)
+                    self.data[base + COLUMN_MAX * capacity + last] = max(self.data[base + COLUMN_MAX * capacity + last], value)
+                    self.data[base + COLUMN_SUM * capacity + last] += value
+                    self.data[base + COLUMN_COUNT * capacity + last] += 1
+                    continue
+
+                self.data[base + COLUMN_TIME * capacity + head] = bucket_time
+                self.data[base + COLUMN_MIN * capacity + head] = value
+                self.data[base + COLUMN_MAX * capacity + head] = value
+                self.data[base + COLUMN_SUM * capacity + head] = value
+                self.data[base + COLUMN_COUNT * capacity + head] = 1
+                self.state[state] = (head + 1) % capacity
+                self.state[state + 1] = min(count + 1, capacity)
+            return True
+
+    def get_window(self, metric: str, nr_points: int, resolution_s: int = TIME_SERIES_RESOLUTION_RAW) -> list[tuple[float, float, float, float]]:
+        """Returns up to nr_points (timestamp, min, max, mean) tuples of a tier, oldest first."""
+        tier = self._get_tier(resolution_s)
+        capacity = self.tiers[tier][1]
+        with self.lock:
+            if self.closed:
+                return []
+            slot = self._get_slot(metric)
+            if slot is None:
+                return []
+
+            base = self._get_base(slot, tier)
+            state = (slot * len(self.tiers) + tier) * 2
+            head, count = self.state[state], self.state[state + 1]
+            points = []
+            for index in range(head - min(nr_points, count), head):
+                index %= capacity
+                points.append((self.data[base + COLUMN_TIME * capacity + index],
+                               self.data[base + COLUMN_MIN * capacity + index],
+                               self.data[base + COLUMN_MAX * capacity + index],
+                               self.data[base + COLUMN_SUM * capacity + index] / self.data[base + COLUMN_COUNT * capacity + index]))
+            return points
+
+    def get_metrics(self) -> list[str]:
+        return [name.decode('utf-8', errors='replace') for name in self.slots.keys()]
+
+    def __close__(self) -> None:
+        if self.file is None:
+            return
+
+        logging.debug("Closing time series store %s", self.path)
+        with self.lock:
+            self.closed = True
+            self.names.release()
+            self.state.release()
+            self.data.release()
+            self.view.release()
+            self.buffer.flush()
+            self.buffer.close()
+            self.file.close()
+            self.file = None
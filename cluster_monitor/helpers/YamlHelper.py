@@ -3,7 +3,6 @@
 
 import logging
 
-import yaml
 import os
 
 from cluster_monitor.dto import Context
@@ -13,6 +12,7 @@ class YamlHelper:
         self.config_dir = config_base_dir
 
     def parse_config(self, context: Context, config_file_names: list[str]) -> None:
+        import yaml
         for config_file in config_file_names:
             config = None
             file_path = os.path.join(self.config_dir, config_file)
@@ -29,22 +29,39 @@ class YamlHelper:
             self.__parse_remote_service_config(config, context)
             self.__parse_renderer_config(config, context)
             self.__parse_supervisor_config(config, context)
+            self.__parse_docker_config(config, context)
+            self.__parse_history_config(config, context)
 
     def __parse_renderer_config(self, config: dict, context: Context) -> None:
         renderer_config = config.get('cluster_monitor', {}).get('renderer', {})
         context.renderer_init_interval_sec = renderer_config.get('init_interval_sec', 5 * 60)
         context.display_update_interval_sec = renderer_config.get('display_update_interval_sec', 5)
+        context.renderer_retained_mode = renderer_config.get('retained_mode', True)
+        context.renderer_font_sizes = renderer_config.get('font_sizes', [])
 
     def __parse_supervisor_config(self, config: dict, context: Context) -> None:
         supervisor_config = config.get('cluster_monitor', {}).get('supervisor', {})
         context.docker_node_down_threshold_sec = supervisor_config.get('docker_node_down_threshold_sec', 60)
 
+    def __parse_docker_config(self, config: dict, context: Context) -> None:
+        docker_config = config.get('cluster_monitor', {}).get('docker', {})
+        context.docker_event_driven = docker_config.get('event_driven', False)
+        context.docker_resync_interval_sec = docker_config.get('resync_interval_sec', 60)
+
+    def __parse_history_config(self, config: dict, context: Context) -> None:
+        history_config = config.get('cluster_monitor', {}).get('history', {})
+        context.history_path = history_config.get('path', '')
+
     def __parse_remote_service_config(self, config: dict, context: Context) -> None:
         remote_config = config.get('cluster_monitor', {}).get('remote_service', {}).get('ssh', {})
         ssh_user = remote_config.get('user', "")
         ssh_key_path = remote_config.get('key_path', "")
         ssh_rpi_status_command = remote_config.get('command_rpi_status', "")
         ssh_rpi_hdd_status_command = remote_config.get('command_rpi_hdd_status', "")
+        ssh_agent_command = remote_config.get('command_agent', "")
+        ssh_rpi_status_interval = remote_config.get('command_rpi_status_interval_sec', 0)
+        ssh_rpi_hdd_status_interval = remote_config.get('command_rpi_hdd_status_interval_sec', 0)
+        ssh_output_format = remote_config.get('output_format', "")
 
         if ssh_user:
             context.remote_ssh_username = ssh_user
@@ -57,3 +74,15 @@ class YamlHelper:
 
         if ssh_rpi_hdd_status_command:
             context.remote_ssh_rpi_hdd_status_command = ssh_rpi_hdd_status_command
+
+        if ssh_rpi_status_interval:
+            context.remote_ssh_rpi_status_interval_sec = ssh_rpi_status_interval
+
+        if ssh_rpi_hdd_status_interval:
+            context.remote_ssh_rpi_hdd_status_interval_sec = ssh_rpi_hdd_status_interval
+
+        if ssh_agent_command:
+            context.remote_ssh_agent_command = ssh_agent_command
+
+        if ssh_output_format:
+            context.remote_ssh_output_format = ssh_output_format
@@ -4,4 +4,8 @@
 __version__ = "1.0.0"
 __author__ = "Ionut-Alexandru Banica"
 
-from cluster_monitor.helpers.YamlHelper import YamlHelper
\ No newline at end of file
+from cluster_monitor.helpers.LazyPackage import LazyPackage
+
+# Helpers are imported on first use, the monitor client only needs a few of them
+__all__ = ["YamlHelper", "CpuSampler", "AgentFrame", "LogTailReader", "LogRingBufferHandler", "TimeSeriesStore", "LazyPackage"]
+LazyPackage.install(__name__)
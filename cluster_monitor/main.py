@@ -3,14 +3,15 @@
 
 import logging, os, sys
 
-from cluster_monitor import CONFIG_FILE_PATHS, RESOURCES_DIR, LIB_DIR
+from cluster_monitor import CONFIG_FILE_PATHS, RESOURCES_DIR, LIB_DIR, RENDERER_TYPE_EPAPER
 if os.path.exists(LIB_DIR) and LIB_DIR not in sys.path:
     sys.path.append(LIB_DIR)
 
 from logging.handlers import TimedRotatingFileHandler
 from cluster_monitor.ClusterMonitor import ClusterMonitor
 from cluster_monitor.dto import Context
-from cluster_monitor.helpers import YamlHelper
+from cluster_monitor.helpers.YamlHelper import YamlHelper
+from cluster_monitor.helpers.LogRingBufferHandler import LogRingBufferHandler
 from cluster_monitor.renderers import cleanup_epaper
 
 def _setup_logging():
@@ -21,10 +22,12 @@ def _setup_logging():
         backupCount=5
     )
     console_handler = logging.StreamHandler()
+    # Keeps the latest records for the logs page, so it does not have to read the log file back
+    ring_buffer_handler = LogRingBufferHandler()
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] [%(threadName)s]: %(message)s",
-        handlers=[file_handler, console_handler]
+        handlers=[file_handler, console_handler, ring_buffer_handler]
     )
 
 def main(context: Context):
@@ -36,5 +39,6 @@ def main(context: Context):
         ClusterMonitor(context).start()
     except Exception as e:
         logging.error("Error starting cluster monitor: %s", e)
-        cleanup_epaper()
+        if context.render_type == RENDERER_TYPE_EPAPER:
+            cleanup_epaper()
         exit(1)
\ No newline at end of file
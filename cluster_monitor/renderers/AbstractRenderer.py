@@ -2,15 +2,104 @@
 # -*- coding:utf-8 -*-
 
 from abc import ABC, abstractmethod
+from typing import Optional
 
-from cluster_monitor.dto import DiskUsageInfo
+from cluster_monitor.dto import DiskUsageInfo, Widget
+from cluster_monitor.renderers.FontRegistry import FontRegistry, DEFAULT_FONT_FACE
 
 RENDER_ALIGN_CENTER = "center"
 RENDER_ALIGN_LEFT = "left"
 RENDER_ALIGN_RIGHT = "right"
 NULL_COORDS = (0, 0, 0, 0)
 
+WIDGET_TEXT = "draw_text"
+WIDGET_PARAGRAPH = "draw_paragraph"
+WIDGET_TABLE = "draw_table"
+WIDGET_SECTION = "draw_new_section"
+WIDGET_SUBSECTION = "draw_new_subsection"
+WIDGET_LOADING = "draw_loading"
+WIDGET_SPARKLINE = "draw_sparkline"
+WIDGET_BAR_GAUGE = "draw_bar_gauge"
+
 class AbstractRenderer(ABC):
+    def __init__(self):
+        self.widgets = {}
+        self.widget_frame = 0
+        self.widget_footprint = None
+
+    def draw_widget(self, name: str, kind: str, *args) -> Optional[tuple[int, int, int, int]]:
+        """Retained-mode drawing: the widget is only re-rendered when its kind or arguments changed."""
+        widget = self.widgets.get(name)
+        if widget is not None and widget.kind == kind and widget.args == args:
+            widget.frame = self.widget_frame
+            return widget.coords
+
+        if widget is not None:
+            self._clear_widget(widget)
+
+        widget = Widget(name, kind, args, None, [], self.widget_frame)
+        self._render_widget(widget)
+        self.widgets[name] = widget
+        return widget.coords
+
+    def _render_widget(self, widget: Widget) -> None:
+        self.widget_footprint = []
+        try:
+            widget.coords = getattr(self, widget.kind)(*widget.args)
+            widget.footprint = self.widget_footprint
+        finally:
+            self.widget_footprint = None
+
+    def _track_widget_area(self, area: tuple[int, int, int, int]) -> None:
+        if self.widget_footprint is not None:
+            self.widget_footprint.append(area)
+
+    def _clear_widget(self, widget: Widget) -> None:
+        self.widgets.pop(widget.name, None)
+        for area in widget.footprint:
+            self._clear_widget_area(area)
+            for other in list(self.widgets.values()):
+                if not other.intersects(area):
+                    continue
+                if other.frame == self.widget_frame and other.args is not None:
+                    # Already declared in this frame: paint it back over the cleared area
+                    self._render_widget(other)
+                else:
+                    # Not declared yet: force a redraw when it is
+                    other.args = None
+
+    def _clear_widget_area(self, area: tuple[int, int, int, int]) -> None:
+        pass
+
+    def _remove_stale_widgets(self) -> None:
+        for widget in [widget for widget in self.widgets.values() if widget.frame != self.widget_frame]:
+            self._clear_widget(widget)
+        self.widget_frame += 1
+
+    def _reset_widgets(self) -> None:
+        self.widgets = {}
+
+    def _get_sparkline_bins(self, points: tuple[tuple[float, float], ...], nr_bins: int) -> list[tuple[float, float]]:
+        """Folds (min, max) points, oldest first, into at most nr_bins (min, max) bins."""
+        if nr_bins <= 0 or len(points) <= 0:
+            return []
+        if len(points) <= nr_bins:
+            return list(points)
+
+        bins = []
+        for i in range(nr_bins):
+            chunk = points[i * len(points) // nr_bins:(i + 1) * len(points) // nr_bins]
+            bins.append((min(point[0] for point in chunk), max(point[1] for point in chunk)))
+        return bins
+
+    def _get_sparkline_range(self, bins: list[tuple[float, float]], value_range: Optional[tuple[float, float]]) -> tuple[float, float]:
+        low, high = value_range if value_range is not None else (min(low for low, _ in bins), max(high for _, high in bins))
+        # A flat series still needs a non empty range to be scaled into
+        return low, high if high > low else low + 1
+
+    def get_font(self, size: int, face: str = DEFAULT_FONT_FACE):
+        return FontRegistry.get_font(size, face)
+
     @abstractmethod
     def draw_text(self, text: str, prev_coords: tuple[int, int, int, int] = NULL_COORDS,
                   alignment: str = RENDER_ALIGN_LEFT, new_line: bool = True) -> tuple[int, int, int, int]:
@@ -76,3 +165,13 @@ class AbstractRenderer(ABC):
     def draw_table(self, headers: dict[str, str], data: list[dict], prev_coords: tuple[int, int, int, int]) -> tuple[
         int, int, int, int]:
         pass
+
+    @abstractmethod
+    def draw_sparkline(self, label: str, points: tuple[tuple[float, float], ...], prev_coords: tuple[int, int, int, int] = NULL_COORDS,
+                       value_range: Optional[tuple[float, float]] = None, new_line: bool = True, width_ratio: float = 1.0) -> tuple[int, int, int, int]:
+        pass
+
+    @abstractmethod
+    def draw_bar_gauge(self, label: str, value: float, prev_coords: tuple[int, int, int, int] = NULL_COORDS,
+                       max_value: float = 100.0, new_line: bool = True, width_ratio: float = 1.0) -> tuple[int, int, int, int]:
+        pass
@@ -4,12 +4,17 @@
 import logging
 import time
 
+from typing import Optional
 from cluster_monitor.renderers.AbstractRenderer import AbstractRenderer, NULL_COORDS, RENDER_ALIGN_LEFT, RENDER_ALIGN_RIGHT, RENDER_ALIGN_CENTER
 from cluster_monitor.dto import Context, DiskUsageInfo
 
+SPARKLINE_BLOCKS = "▁▂▃▄▅▆▇█"
+GAUGE_FILLED_BLOCK = "█"
+GAUGE_EMPTY_BLOCK = "░"
 
 class ConsoleRenderer(AbstractRenderer):
     def __init__(self, context: Context):
+        super().__init__()
         self.logger = logging.getLogger("ConsoleRenderer")
         logging.basicConfig(level=logging.INFO)  # Configure logging level
         self.section_delimiter = '=' * 50  # Delimiter for new sections
@@ -43,11 +48,33 @@ class ConsoleRenderer(AbstractRenderer):
         _, _, _, y2 = prev_coords
         return 0, y2, self.line_width, y2 + 1
 
+    def draw_sparkline(self, label: str, points: tuple[tuple[float, float], ...], prev_coords: tuple[int, int, int, int] = NULL_COORDS,
+                       value_range: Optional[tuple[float, float]] = None, new_line: bool = True, width_ratio: float = 1.0) -> tuple[int, int, int, int]:
+        # One block character per bin, its height follows the middle of the bin's min and max
+        bins = self._get_sparkline_bins(points, int((self.line_width - len(label) - 1) * width_ratio))
+        blocks = ""
+        if len(bins) > 0:
+            low, high = self._get_sparkline_range(bins, value_range)
+            for bin_min, bin_max in bins:
+                level = (min(max((bin_min + bin_max) / 2, low), high) - low) / (high - low)
+                blocks += SPARKLINE_BLOCKS[round(level * (len(SPARKLINE_BLOCKS) - 1))]
+
+        return self.draw_text(f"{label} {blocks}", prev_coords, RENDER_ALIGN_LEFT, new_line)
+
+    def draw_bar_gauge(self, label: str, value: float, prev_coords: tuple[int, int, int, int] = NULL_COORDS,
+                       max_value: float = 100.0, new_line: bool = True, width_ratio: float = 1.0) -> tuple[int, int, int, int]:
+        width = max(int((self.line_width - len(label) - 3) * width_ratio), 0)
+        filled = round(min(max(value / max_value, 0.0), 1.0) * width) if max_value > 0 else 0
+
+        return self.draw_text(f"{label} [{GAUGE_FILLED_BLOCK * filled}{GAUGE_EMPTY_BLOCK * (width - filled)}]",
+                              prev_coords, RENDER_ALIGN_LEFT, new_line)
+
     def draw_area(self, x: int, y: int, width: int, height: int, color=None) -> None:
         self.logger.info(f"Drawing area at ({x}, {y}) with width={width}, height={height}, color={color}")
 
     def refresh(self) -> None:
         self.logger.info("Refreshing the rendered content")
+        self._reset_widgets()
 
     def hard_refresh(self) -> None:
         self.logger.info("Hard refreshing the rendered content")
@@ -57,7 +84,9 @@ class ConsoleRenderer(AbstractRenderer):
         time.sleep(5)
 
     def draw_apply(self) -> None:
-        pass
+        self._remove_stale_widgets()
+        # A log has nothing to keep on screen, every frame is printed in full like before retained mode
+        self._reset_widgets()
 
     def __close__(self) -> None:
         self.logger.info("Closing ConsoleRenderer")
@@ -88,7 +117,7 @@ class ConsoleRenderer(AbstractRenderer):
         return self.context.default_page
 
     def get_total_pages(self) -> int:
-        return 4
+        return 5
 
     def get_current_scroll_step(self) -> int:
         return 100
@@ -0,0 +1,34 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import logging
+import os
+import threading
+
+from cluster_monitor import RESOURCES_DIR
+
+DEFAULT_FONT_FACE = 'Font.ttc'
+
+class FontRegistry:
+    fonts = {}
+    lock = threading.Lock()
+
+    @staticmethod
+    def get_font(size: int, face: str = DEFAULT_FONT_FACE):
+        key = (face, size)
+        with FontRegistry.lock:
+            font = FontRegistry.fonts.get(key)
+            if font is None:
+                from PIL import ImageFont
+                logging.debug("Loading font %s with size %s", face, size)
+                font = ImageFont.truetype(os.path.join(RESOURCES_DIR, face), size)
+                FontRegistry.fonts[key] = font
+            return font
+
+    @staticmethod
+    def preload(sizes: list[int], face: str = DEFAULT_FONT_FACE) -> None:
+        for size in sizes:
+            try:
+                FontRegistry.get_font(size, face)
+            except Exception as e:
+                logging.error(f"Error preloading font {face} with size {size}: {e}")
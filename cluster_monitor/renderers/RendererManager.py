@@ -4,17 +4,19 @@
 import logging
 
 from cluster_monitor.renderers.AbstractRenderer import AbstractRenderer
-from cluster_monitor.renderers.ConsoleRenderer import ConsoleRenderer
-from cluster_monitor.renderers.ePaper import EPaperRenderer
 from cluster_monitor import RENDERER_TYPE_EPAPER, RENDERER_TYPE_CONSOLE
 from cluster_monitor.dto import Context
 
 
 class RendererManager:
     def __init__(self, context: Context):
+        self.render_type = context.render_type
+        # Renderers pull in their display libraries, only the selected one is imported
         if context.render_type == RENDERER_TYPE_CONSOLE:
+            from cluster_monitor.renderers.ConsoleRenderer import ConsoleRenderer
             self.renderer = ConsoleRenderer(context)
         elif context.render_type == RENDERER_TYPE_EPAPER:
+            from cluster_monitor.renderers.ePaper import EPaperRenderer
             self.renderer = EPaperRenderer(context)
 
     def get_renderer(self) -> AbstractRenderer:
@@ -23,5 +25,7 @@ class RendererManager:
     def __close__(self) -> None:
         logging.info("Closing RendererManager")
         self.renderer.__close__()
-        EPaperRenderer.shutdown()
+        if self.render_type == RENDERER_TYPE_EPAPER:
+            from cluster_monitor.renderers.ePaper import EPaperRenderer
+            EPaperRenderer.shutdown()
         logging.info("RendererManager closed")
\ No newline at end of file
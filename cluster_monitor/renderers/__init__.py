@@ -4,7 +4,14 @@
 __version__ = "1.0.0"
 __author__ = "Ionut-Alexandru Banica"
 
-from cluster_monitor.renderers.AbstractRenderer import AbstractRenderer, RENDER_ALIGN_LEFT, RENDER_ALIGN_RIGHT, RENDER_ALIGN_CENTER, NULL_COORDS
+from cluster_monitor.renderers.AbstractRenderer import AbstractRenderer, RENDER_ALIGN_LEFT, RENDER_ALIGN_RIGHT, RENDER_ALIGN_CENTER, NULL_COORDS, \
+    WIDGET_TEXT, WIDGET_PARAGRAPH, WIDGET_TABLE, WIDGET_SECTION, WIDGET_SUBSECTION, WIDGET_LOADING, \
+    WIDGET_SPARKLINE, WIDGET_BAR_GAUGE
+from cluster_monitor.renderers.FontRegistry import FontRegistry
 from cluster_monitor.renderers.ConsoleRenderer import ConsoleRenderer
 from cluster_monitor.renderers.RendererManager import RendererManager
-from cluster_monitor.renderers.ePaper import ePaperRenderer, cleanup_epaper
\ No newline at end of file
+
+def cleanup_epaper() -> None:
+    # The ePaper driver needs GPIO and SPI libraries, import it only when it is actually used
+    from cluster_monitor.renderers.ePaper import cleanup_epaper as cleanup
+    cleanup()
\ No newline at end of file
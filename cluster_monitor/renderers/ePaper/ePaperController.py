@@ -57,6 +57,10 @@ class EPaperController:
                 logging.info("Key 4 pressed - scroll down (only on page 2)")
                 if self.current_page == 2:
                     setattr(self, 'scroll_offset', min(1000, self.scroll_offset + self.scroll_step))
+                elif self.current_page == 4:
+                    logging.info("Key 4 pressed again - switching to page 5")
+                    setattr(self, 'current_page', 5)
+                    setattr(self, 'scroll_offset', 0)
                 else:
                     setattr(self, 'current_page', 4)
                     setattr(self, 'scroll_offset', 0)
@@ -78,4 +82,4 @@ class EPaperController:
         return self.scroll_offset
 
     def get_total_pages(self):
-        return 4
+        return 5
@@ -1,22 +1,24 @@
 #!/usr/bin/python
 # -*- coding:utf-8 -*-
 
-import os
+import math
 import threading
 import time
 import logging
 
-from cluster_monitor import RESOURCES_DIR
+from typing import Optional
 from cluster_monitor.dto import Context, DiskUsageInfo
-from cluster_monitor.renderers import AbstractRenderer, NULL_COORDS, RENDER_ALIGN_LEFT, RENDER_ALIGN_RIGHT, RENDER_ALIGN_CENTER
+from cluster_monitor.renderers import AbstractRenderer, FontRegistry, NULL_COORDS, RENDER_ALIGN_LEFT, RENDER_ALIGN_RIGHT, RENDER_ALIGN_CENTER
 from waveshare_epd import epd2in7_V2
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from cluster_monitor.renderers.ePaper.ePaperController import EPaperController
+from cluster_monitor.renderers.ePaper.ePaperTextCache import EPaperTextCache
 
 DEFAULT_SECTION_Y_PADDING = 5
 DEFAULT_SECTION_X_PADDING = 5
 DEFAULT_FONT_SIZE = 11
 DEFAULT_TABLE_FONT_SIZE = 10
+DEFAULT_CHART_X_PADDING = 3
 COLOR_WHITE=0xff
 COLOR_BLACK=0x00
 COLOR_GRAY=0x80
@@ -26,10 +28,18 @@ def cleanup_epaper():
 
 class EPaperRenderer(AbstractRenderer):
     def __init__(self, context: Context):
+        super().__init__()
         self.epd = epd2in7_V2.EPD()
-        self.fontType = ImageFont.truetype(os.path.join(RESOURCES_DIR, 'Font.ttc'), DEFAULT_FONT_SIZE)
+        FontRegistry.preload(context.renderer_font_sizes)
+        self.fontType = self.get_font(DEFAULT_FONT_SIZE)
         self.Himage = Image.new('1', (self.epd.height, self.epd.width), COLOR_WHITE)
         self.draw = ImageDraw.Draw(self.Himage)
+        self.text_cache = EPaperTextCache()
+        self.font_line_height = sum(self.fontType.getmetrics())
+        self.dirty_areas = []
+        self.previous_dirty_areas = []
+        self.last_frame = None
+        self.last_frame_buffer = None
         self.controller = EPaperController(context)
         self.init_interval = context.renderer_init_interval_sec
         self.hard_refresh(True)
@@ -43,6 +53,9 @@ class EPaperRenderer(AbstractRenderer):
         self.epd.init()
         self.epd.Clear()
         self.epd.display_Base_color(COLOR_WHITE)
+        self.previous_dirty_areas = []
+        self.last_frame = None
+        self.last_frame_buffer = None
         self.refresh()
 
     def _run_periodic_init_task(self):
@@ -55,7 +68,7 @@ class EPaperRenderer(AbstractRenderer):
         _, _, x2, y2 = prev_coords
 
         # Calculate text dimensions
-        text_width = self.draw.textlength(text, font=self.fontType)
+        text_width = self.text_cache.get_text_length(self.draw, text, self.fontType)
         text_x = DEFAULT_SECTION_X_PADDING
         if not new_line:
             text_x += x2
@@ -67,10 +80,51 @@ class EPaperRenderer(AbstractRenderer):
 
         text_y = y2 + DEFAULT_SECTION_Y_PADDING
 
-        self.draw.text((text_x, text_y), text, font=self.fontType, fill=COLOR_BLACK)
+        self.text_cache.draw_text(self.Himage, self.draw, (text_x, text_y), text, self.fontType, COLOR_BLACK)
+        self._mark_dirty_area((text_x, text_y, text_x + text_width, text_y + self.font_line_height))
 
         return text_x, text_y, text_x + text_width, text_y + DEFAULT_FONT_SIZE
 
+    def _get_chart_area(self, coords: tuple[int, int, int, int], width_ratio: float) -> tuple[int, int, int, int]:
+        # Charts sit right of their label and are as tall as a text line
+        _, y1, x2, _ = coords
+        x_start = x2 + DEFAULT_CHART_X_PADDING
+        x_end = x_start + int((self.epd.height - DEFAULT_SECTION_X_PADDING - x_start) * width_ratio)
+        return x_start, y1 + 1, max(x_start, x_end), y1 + self.font_line_height - 2
+
+    def draw_sparkline(self, label: str, points: tuple[tuple[float, float], ...], prev_coords: tuple[int, int, int, int] = NULL_COORDS,
+                       value_range: Optional[tuple[float, float]] = None, new_line: bool = True, width_ratio: float = 1.0) -> tuple[int, int, int, int]:
+        coords = self.draw_text(label, prev_coords, RENDER_ALIGN_LEFT, new_line)
+        x1, y1, x2, y2 = self._get_chart_area(coords, width_ratio)
+
+        # One bin per pixel column at most, each drawn as a bar spanning the bin's min to max
+        bins = self._get_sparkline_bins(points, x2 - x1)
+        if len(bins) > 0:
+            low, high = self._get_sparkline_range(bins, value_range)
+            bin_width = (x2 - x1) / len(bins)
+            for i, (bin_min, bin_max) in enumerate(bins):
+                bar_x1 = x1 + int(i * bin_width)
+                bar_x2 = max(bar_x1, x1 + int((i + 1) * bin_width) - 1)
+                bar_y1 = y2 - round((min(max(bin_max, low), high) - low) / (high - low) * (y2 - y1))
+                bar_y2 = y2 - round((min(max(bin_min, low), high) - low) / (high - low) * (y2 - y1))
+                self.draw.rectangle((bar_x1, bar_y1, bar_x2, bar_y2), fill=COLOR_BLACK)
+        self._mark_dirty_area((x1, y1, x2, y2))
+
+        return coords[0], coords[1], x2, coords[3]
+
+    def draw_bar_gauge(self, label: str, value: float, prev_coords: tuple[int, int, int, int] = NULL_COORDS,
+                       max_value: float = 100.0, new_line: bool = True, width_ratio: float = 1.0) -> tuple[int, int, int, int]:
+        coords = self.draw_text(label, prev_coords, RENDER_ALIGN_LEFT, new_line)
+        x1, y1, x2, y2 = self._get_chart_area(coords, width_ratio)
+
+        fill_x = x1 + round(min(max(value / max_value, 0.0), 1.0) * (x2 - x1)) if max_value > 0 else x1
+        self.draw.rectangle((x1, y1, x2, y2), outline=COLOR_BLACK, fill=COLOR_WHITE)
+        if fill_x > x1:
+            self.draw.rectangle((x1, y1, fill_x, y2), fill=COLOR_BLACK)
+        self._mark_dirty_area((x1, y1, x2, y2))
+
+        return coords[0], coords[1], x2, coords[3]
+
     def _clear_specific_area(self, coords: tuple[int, int, int, int]) -> None:
         x1, y1, x2, y2 = coords
         self.draw.rectangle((x1, y1, x2, y2), fill=COLOR_WHITE)
@@ -79,6 +133,7 @@ class EPaperRenderer(AbstractRenderer):
         _,_,_,y2 = prev_coords
         line_y = y2 + DEFAULT_SECTION_Y_PADDING # Position slightly from the top
         self.draw.line((0, line_y, self.epd.height, line_y), fill=COLOR_BLACK)
+        self._mark_dirty_area((0, line_y, self.epd.height, line_y))
 
         return 0, y2, self.epd.height, line_y
 
@@ -87,6 +142,7 @@ class EPaperRenderer(AbstractRenderer):
         line_y = y2 + DEFAULT_SECTION_Y_PADDING# Position slightly from the top
         line_x =  self.epd.height-2*DEFAULT_SECTION_X_PADDING
         self.draw.line((2*DEFAULT_SECTION_X_PADDING, line_y, line_x, line_y), fill=COLOR_BLACK)
+        self._mark_dirty_area((2*DEFAULT_SECTION_X_PADDING, line_y, line_x, line_y))
 
         return (0, self.epd.height, y2, line_y)
 
@@ -101,39 +157,117 @@ class EPaperRenderer(AbstractRenderer):
 
     def draw_area(self, x: int, y: int, width: int, height: int, color=None):
         self.draw.rectangle((x, y, x + width, y + height), fill=color or 0)
+        self._mark_dirty_area((x, y, x + width, y + height))
         print(f"EpaperRenderer: Area drawn at ({x}, {y}, {width}, {height})")  # Optional debug logging
 
     def refresh(self):
         self._clear_specific_area((0, 0, self.epd.height, self.epd.width))
+        self.dirty_areas = []
+        self._reset_widgets()
 
     def draw_loading(self, prev_coords: tuple[int, int, int, int]):
         _, _, _, y2 = prev_coords
-        text_width = self.draw.textlength("Loading...", font=self.fontType)
+        text_width = self.text_cache.get_text_length(self.draw, "Loading...", self.fontType)
 
         center_y = y2 + (self.epd.width - y2) // 2
         center_x = (self.epd.height - text_width) // 2
 
-        self.draw.text(
+        self.text_cache.draw_text(
+            self.Himage,
+            self.draw,
             (center_x, center_y),
             "Loading...",
-            font=self.fontType,
-            fill=COLOR_BLACK
+            self.fontType,
+            COLOR_BLACK
         )
+        self._mark_dirty_area((center_x, center_y, center_x + text_width, center_y + self.font_line_height))
 
-    def _draw_apply(self, updated_area):
-        newimage = self.Himage.crop(updated_area)
-        self.Himage.paste(newimage, updated_area)
-        self.epd.display_Partial(self.epd.getbuffer(self.Himage), *updated_area)
+    def _mark_dirty_area(self, coords: tuple[int, int, int, int]) -> None:
+        x1, y1, x2, y2 = coords
+        x1, x2 = max(math.floor(min(x1, x2)), 0), min(math.ceil(max(x1, x2)) + 1, self.epd.height)
+        y1, y2 = max(math.floor(min(y1, y2)), 0), min(math.ceil(max(y1, y2)) + 1, self.epd.width)
+        if x1 >= x2 or y1 >= y2:
+            return
+        self.dirty_areas.append((x1, y1, x2, y2))
+        self._track_widget_area((x1, y1, x2, y2))
+
+    def _clear_widget_area(self, area: tuple[int, int, int, int]) -> None:
+        x1, y1, x2, y2 = area
+        self._clear_specific_area((x1, y1, x2 - 1, y2 - 1))
+        self.dirty_areas.append(area)
+
+    def _get_dirty_windows(self, areas: list[tuple[int, int, int, int]]) -> list[tuple[int, int, int, int]]:
+        # The canvas is landscape while the panel RAM is portrait: canvas (x, y) lands on panel (y, height - x - 1)
+        windows = []
+        for x1, y1, x2, y2 in areas:
+            windows.append((y1 // 8 * 8, self.epd.height - x2, math.ceil(y2 / 8) * 8, self.epd.height - x1))
+
+        # Merge byte aligned windows that overlap or touch so every RAM row is only sent once
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(windows)):
+                for j in range(i + 1, len(windows)):
+                    a, b = windows[i], windows[j]
+                    if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                        windows[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                        windows.pop(j)
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        return windows
+
+    def _get_changed_rows(self, buffer) -> list[int]:
+        if self.last_frame_buffer is None:
+            return list(range(self.epd.height))
+
+        row_size = self.epd.width // 8
+        return [row for row in range(self.epd.height)
+                if buffer[row * row_size:(row + 1) * row_size] != self.last_frame_buffer[row * row_size:(row + 1) * row_size]]
+
+    def _narrow_windows(self, windows: list[tuple[int, int, int, int]], changed_rows: list[int]) -> list[tuple[int, int, int, int]]:
+        narrowed_windows = []
+        for x1, y1, x2, y2 in windows:
+            rows = [row for row in changed_rows if y1 <= row < y2]
+            if len(rows) <= 0:
+                continue
+            narrowed_windows.append((x1, rows[0], x2, rows[-1] + 1))
+
+        return narrowed_windows
+
+    def _draw_apply(self, buffer, updated_areas: list[tuple[int, int, int, int]]) -> None:
+        if len(updated_areas) <= 0:
+            return
+        self.epd.display_Partial_Windows(buffer, updated_areas)
 
     def draw_apply(self):
-        self._draw_apply((0, 0, self.epd.width, self.epd.height))
+        self._remove_stale_widgets()
+
+        # Whatever was drawn in the previous frame has to be sent as well, so erased content gets cleared
+        dirty_areas = self.previous_dirty_areas + self.dirty_areas
+        self.previous_dirty_areas = self.dirty_areas
+        self.dirty_areas = []
+
+        frame = self.Himage.tobytes()
+        if frame == self.last_frame:
+            logging.debug("Frame unchanged, skipping e-paper update")
+            return
+
+        buffer = self.epd.getbuffer(self.Himage)
+        changed_rows = self._get_changed_rows(buffer)
+        logging.debug("E-paper rows changed: %s", changed_rows)
+        self._draw_apply(buffer, self._narrow_windows(self._get_dirty_windows(dirty_areas), changed_rows))
+        self.last_frame = frame
+        self.last_frame_buffer = buffer
 
     def draw_paragraph(self, strings: list[str], prev_coords: tuple[int, int, int, int],  current_line: str = "") -> tuple[int, int, int, int]:
         coords = prev_coords
 
         for string in strings:
             tentative_line = f"{current_line}{string}, "
-            text_width = self.draw.textlength(tentative_line, font=self.fontType)
+            text_width = self.text_cache.get_text_length(self.draw, tentative_line, self.fontType)
 
             # Check if the line fits the e-paper width
             if text_width > self.epd.height - 2 * DEFAULT_SECTION_X_PADDING:
@@ -187,17 +321,17 @@ class EPaperRenderer(AbstractRenderer):
 
         current_y += HEADER_BORDER_WIDTH
         header_height = font_size + 2 * DEFAULT_SECTION_Y_PADDING
-        table_font = ImageFont.truetype(os.path.join(RESOURCES_DIR, 'Font.ttc'), font_size)
+        table_font = self.get_font(font_size)
 
         # Draw header cells
         for i, (key, header_text) in enumerate(headers.items()):
             x = DEFAULT_SECTION_X_PADDING + (i * column_width)
 
             # Draw header text
-            text_width = self.draw.textlength(header_text, font=table_font)
+            text_width = self.text_cache.get_text_length(self.draw, header_text, table_font)
             text_x = x + (column_width - text_width) // 2
             text_y = current_y + DEFAULT_SECTION_Y_PADDING
-            self.draw.text((text_x, text_y), header_text, font=table_font, fill=COLOR_BLACK)
+            self.text_cache.draw_text(self.Himage, self.draw, (text_x, text_y), header_text, table_font, COLOR_BLACK)
 
         current_y += header_height
 
@@ -216,10 +350,10 @@ class EPaperRenderer(AbstractRenderer):
 
                 # Draw cell text
                 cell = str(row.get(key, ''))
-                text_width = self.draw.textlength(cell, font=table_font)
+                text_width = self.text_cache.get_text_length(self.draw, cell, table_font)
                 text_x = x + (column_width - text_width) // 2
                 text_y = current_y + DEFAULT_SECTION_Y_PADDING
-                self.draw.text((text_x, text_y), cell, font=table_font, fill=COLOR_BLACK)
+                self.text_cache.draw_text(self.Himage, self.draw, (text_x, text_y), cell, table_font, COLOR_BLACK)
 
             current_y += row_height
 
@@ -228,6 +362,9 @@ class EPaperRenderer(AbstractRenderer):
                             self.epd.height - DEFAULT_SECTION_X_PADDING, current_y),
                            fill=COLOR_BLACK, width=INTERNAL_BORDER_WIDTH)
 
+        self._mark_dirty_area((DEFAULT_SECTION_X_PADDING, start_y,
+                               self.epd.height - DEFAULT_SECTION_X_PADDING, current_y + HEADER_BORDER_WIDTH))
+
         return (DEFAULT_SECTION_X_PADDING, start_y,
                 self.epd.height - DEFAULT_SECTION_X_PADDING, current_y)
 
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import math
+import threading
+
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+
+TEXT_LENGTH_CACHE_SIZE = 2048
+TEXT_STRIP_CACHE_BYTES = 512 * 1024
+TEXT_STRIP_MARGIN = 2
+
+class EPaperTextCache:
+    def __init__(self, max_lengths: int = TEXT_LENGTH_CACHE_SIZE, max_strip_bytes: int = TEXT_STRIP_CACHE_BYTES):
+        self.lock = threading.Lock()
+        self.max_lengths = max_lengths
+        self.max_strip_bytes = max_strip_bytes
+        self.lengths = OrderedDict()
+        self.strips = OrderedDict()
+        self.strip_bytes = 0
+
+    @staticmethod
+    def _font_key(font: ImageFont.FreeTypeFont) -> tuple:
+        return getattr(font, 'path', id(font)), getattr(font, 'size', 0), getattr(font, 'index', 0)
+
+    def get_text_length(self, draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeTypeFont) -> float:
+        key = (self._font_key(font), text)
+        with self.lock:
+            if key in self.lengths:
+                self.lengths.move_to_end(key)
+                return self.lengths[key]
+
+        text_length = draw.textlength(text, font=font)
+        with self.lock:
+            self.lengths[key] = text_length
+            while len(self.lengths) > self.max_lengths:
+                self.lengths.popitem(last=False)
+        return text_length
+
+    def _rasterize(self, text: str, font: ImageFont.FreeTypeFont, start: tuple[float, float]) -> tuple[Image.Image, int, int]:
+        left, top, right, bottom = font.getbbox(text, mode='1')
+        origin_x = TEXT_STRIP_MARGIN - math.floor(min(left, 0))
+        origin_y = TEXT_STRIP_MARGIN - math.floor(min(top, 0))
+        strip = Image.new('1', (origin_x + math.ceil(right) + TEXT_STRIP_MARGIN,
+                                origin_y + math.ceil(bottom) + TEXT_STRIP_MARGIN), 0)
+        ImageDraw.Draw(strip).text((origin_x + start[0], origin_y + start[1]), text, font=font, fill=0xff)
+        return strip, origin_x, origin_y
+
+    def _get_strip(self, text: str, font: ImageFont.FreeTypeFont, start: tuple[float, float]) -> tuple[Image.Image, int, int]:
+        key = (self._font_key(font), text, start)
+        with self.lock:
+            if key in self.strips:
+                self.strips.move_to_end(key)
+                return self.strips[key]
+
+        strip = self._rasterize(text, font, start)
+        strip_size = strip[0].width * strip[0].height
+        if strip_size > self.max_strip_bytes:
+            return strip
+
+        with self.lock:
+            if key not in self.strips:
+                self.strips[key] = strip
+                self.strip_bytes += strip_size
+            while self.strip_bytes > self.max_strip_bytes:
+                _, (evicted, _, _) = self.strips.popitem(last=False)
+                self.strip_bytes -= evicted.width * evicted.height
+        return strip
+
+    def draw_text(self, image: Image.Image, draw: ImageDraw.ImageDraw, xy: tuple[float, float], text: str,
+                  font: ImageFont.FreeTypeFont, fill: int) -> None:
+        x, y = xy
+        if x < 0 or y < 0 or not isinstance(font, ImageFont.FreeTypeFont):
+            # PIL truncates negative positions towards zero, keep the exact layout by drawing directly
+            draw.text(xy, text, font=font, fill=fill)
+            return
+
+        # Glyph rasterization depends on the sub-pixel start, which is part of the cache key
+        start_x, start_y = math.modf(x)[0], math.modf(y)[0]
+        strip, origin_x, origin_y = self._get_strip(text, font, (start_x, start_y))
+        image.paste(fill, (int(x) - origin_x, int(y) - origin_y), strip)
@@ -4,23 +4,39 @@
 import docker
 import logging
 import threading
-import time
 
 from natsort import natsorted
-from typing import Any
+from typing import Any, Callable, Optional
 from cluster_monitor.dto import DockerStatus
 
 DOCKER_UPDATE_INTERVAL_S = 2
+DOCKER_RESYNC_INTERVAL_S = 60
 DOCKER_NODE_STATE_READY = "ready"
 DOCKER_NODE_STATE_DOWN = "down"
+# Swarm has no task events: service and node events are combined with local container start/die events
+DOCKER_EVENT_FILTERS = {
+    'type': ['service', 'node', 'container'],
+    'event': ['create', 'update', 'remove', 'start', 'die'],
+}
+DOCKER_SERVICE_ID_LABEL = 'com.docker.swarm.service.id'
 
 
 class DockerService:
-    def __init__(self):
+    def __init__(self, event_driven: bool = False, resync_interval_sec: int = DOCKER_RESYNC_INTERVAL_S):
         self.client = docker.from_env()
         self.low_level_client = docker.APIClient()
+        self.event_driven = event_driven
+        self.update_interval = resync_interval_sec if event_driven else DOCKER_UPDATE_INTERVAL_S
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.events = None
         self.services = []
         self.nodes = []
+        self.tasks_by_service = {}
+        self.node_hostnames_by_id = {}
+        self.derived_views = {}
+        self.state_signature = None
+        self.service_statuses = {}
         self.node_down_times = {}
         logging.debug("Connecting to Docker daemon and performing initial update. This may take a while, please wait...")
         self._update()
@@ -31,14 +47,129 @@ class DockerService:
         self.thread.start()
         logging.info("Docker update thread [%s] started.", self.thread.name)
 
+        self.events_thread = None
+        if self.event_driven:
+            self.events_thread = threading.Thread(target=self._docker_events_task, daemon=True)
+            self.events_thread.start()
+            logging.info("Docker events thread [%s] started.", self.events_thread.name)
+
     def _update(self) -> None:
         try:
-            self.nodes = self.client.nodes.list()
-            self.services = self.client.services.list()
+            self._refresh()
         except Exception as e:
             logging.error(f"Error pinging Docker daemon: {e}")
             self.nodes = []
             self.services = []
+            self.tasks_by_service = {}
+            self.node_hostnames_by_id = {}
+            self.derived_views = {}
+            self.state_signature = None
+            self.service_statuses = {}
+
+    def _refresh(self) -> None:
+        with self.lock:
+            # Raw listings are cheap, models are only rebuilt for objects whose version moved on
+            nodes = self._reuse_models(self.nodes, self.low_level_client.nodes(), self.client.nodes.prepare_model)
+            services = self._reuse_models(self.services, self.low_level_client.services(), self.client.services.prepare_model)
+            tasks = self.low_level_client.tasks()
+
+            tasks_by_service = {}
+            for task in tasks:
+                tasks_by_service.setdefault(task.get('ServiceID'), []).append(task)
+
+            self._publish(nodes, services, tasks_by_service)
+
+    @staticmethod
+    def _get_version(attrs: dict) -> Optional[int]:
+        return attrs.get('Version', {}).get('Index')
+
+    def _reuse_models(self, previous: list, attrs_list: list[dict], prepare_model: Callable[[dict], Any]) -> list:
+        previous_by_id = {model.id: model for model in previous}
+        models = []
+        for attrs in attrs_list:
+            model = previous_by_id.get(attrs.get('ID'))
+            version = self._get_version(attrs)
+            if model is None or version is None or self._get_version(model.attrs) != version:
+                model = prepare_model(attrs)
+            models.append(model)
+        return models
+
+    def _get_state_signature(self, nodes: list, services: list, tasks_by_service: dict[str, list]) -> tuple:
+        return (tuple((node.id, self._get_version(node.attrs)) for node in nodes),
+                tuple((service.id, self._get_version(service.attrs)) for service in services),
+                tuple((service_id, self._get_tasks_signature(tasks)) for service_id, tasks in tasks_by_service.items()))
+
+    def _get_tasks_signature(self, tasks: list) -> tuple:
+        return tuple((task.get('ID'), self._get_version(task)) for task in tasks)
+
+    def _publish(self, nodes: list, services: list, tasks_by_service: dict[str, list]) -> None:
+        state_signature = self._get_state_signature(nodes, services, tasks_by_service)
+        if state_signature == self.state_signature:
+            # Nothing changed since the previous generation, keep its derived views
+            return
+
+        self.state_signature = state_signature
+        self.node_hostnames_by_id = {node.id: node.attrs.get('Description', {}).get('Hostname', '') for node in nodes}
+        self.tasks_by_service = tasks_by_service
+        self.nodes = nodes
+        self.services = services
+        # Start a new generation: projections are recomputed on first use after each refresh
+        self.derived_views = {}
+
+    def _apply_event(self, event: dict) -> None:
+        event_type = event.get('Type')
+        action = event.get('Action')
+        actor = event.get('Actor', {})
+        logging.debug("Docker event %s %s for %s", event_type, action, actor.get('ID'))
+
+        with self.lock:
+            if event_type == 'service':
+                self._apply_service_event(actor.get('ID'), action == 'remove')
+            elif event_type == 'node':
+                self._apply_node_event(actor.get('ID'), action == 'remove')
+            elif event_type == 'container':
+                service_id = actor.get('Attributes', {}).get(DOCKER_SERVICE_ID_LABEL)
+                if service_id:
+                    tasks_by_service = dict(self.tasks_by_service)
+                    tasks_by_service[service_id] = self.low_level_client.tasks(filters={"service": service_id})
+                    self._publish(self.nodes, self.services, tasks_by_service)
+
+    def _apply_service_event(self, service_id: str, is_removed: bool) -> None:
+        service = None
+        if not is_removed:
+            try:
+                service = self.client.services.get(service_id)
+            except docker.errors.NotFound:
+                logging.debug("Service %s no longer exists", service_id)
+
+        # Updated services keep their place, so page 2 does not reorder on every event
+        services = [existing if existing.id != service_id else service for existing in self.services]
+        if service is not None and all(existing.id != service_id for existing in self.services):
+            services.append(service)
+        tasks_by_service = dict(self.tasks_by_service)
+        tasks_by_service.pop(service_id, None)
+        if service is not None:
+            tasks_by_service[service_id] = self.low_level_client.tasks(filters={"service": service_id})
+        self._publish(self.nodes, [existing for existing in services if existing is not None], tasks_by_service)
+
+    def _apply_node_event(self, node_id: str, is_removed: bool) -> None:
+        node = None
+        if not is_removed:
+            try:
+                node = self.client.nodes.get(node_id)
+            except docker.errors.NotFound:
+                logging.debug("Node %s no longer exists", node_id)
+
+        nodes = [existing if existing.id != node_id else node for existing in self.nodes]
+        if node is not None and all(existing.id != node_id for existing in self.nodes):
+            nodes.append(node)
+        self._publish([existing for existing in nodes if existing is not None], self.services, self.tasks_by_service)
+
+    def _get_derived_view(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        views = self.derived_views
+        if key not in views:
+            views[key] = compute()
+        return views[key]
 
     def count_all_nodes(self) -> int:
         return len(self.nodes)
@@ -50,59 +181,87 @@ class DockerService:
         return len(self.services)
 
     def get_nodes_by_state(self, state) -> list:
+        return self._get_derived_view(('nodes_by_state', state), lambda: self._get_nodes_by_state(state))
+
+    def _get_nodes_by_state(self, state) -> list:
         if len(self.nodes) <= 0:
             return []
         return [node for node in self.nodes if node.attrs.get('Status', {}).get('State') == state]
 
     def extract_node_hostnames(self, node_state: str = DOCKER_NODE_STATE_READY) -> list[Any]:
-        return natsorted([node.attrs.get('Description', {}).get('Hostname') for node in self.get_nodes_by_state(node_state)])
+        return self._get_derived_view(('node_hostnames', node_state), lambda: natsorted(
+            [node.attrs.get('Description', {}).get('Hostname') for node in self.get_nodes_by_state(node_state)]))
 
 
     def extract_service_names(self) -> list[str]:
+        return self._get_derived_view(('service_names',), self._extract_service_names)
+
+    def _extract_service_names(self) -> list[str]:
         service_names = []
         for service in self.extract_service_details():
             service_names.append(f"{service.name_short[:3]}")
 
         return service_names
+
     def extract_open_host_ports(self) -> list[int]:
+        return self._get_derived_view(('open_host_ports',), self._extract_open_host_ports)
+
+    def _extract_open_host_ports(self) -> list[int]:
         ports = []
         for service in self.extract_service_details():
             ports.extend(service.ports_short)
         return natsorted(ports)
 
     def extract_service_details(self) -> list[DockerStatus]:
-        service_details = []
+        return self._get_derived_view(('service_details',), self._extract_service_details)
+
+    def _extract_service_details(self) -> list[DockerStatus]:
+        nodes_signature = self.state_signature[0] if self.state_signature else ()
+        service_statuses = {}
         for service in self.services:
-            ports = []
-            if 'Ports' in service.attrs.get('Endpoint', {}):
-                for port in service.attrs['Endpoint']['Ports']:
-                    ports.append({
-                        'published': port.get('PublishedPort'),
-                        'target': port.get('TargetPort'),
-                        'protocol': port.get('Protocol')
-                    })
-
-            tasks = self.get_tasks_for_service(service.id)
-            node_hostnames = [node.attrs.get('Description', {}).get('Hostname', '') for node in self._get_nodes_for_service(service.id)]
-
-            service_detail = DockerStatus(
-                name=service.name,
-                namespace=service.attrs.get('Spec', {}).get('Labels', {}).get('com.docker.stack.namespace', ''),
-                id=service.id,
-                created=service.attrs.get('CreatedAt', ''),
-                updated=service.attrs.get('UpdatedAt', ''),
-                mode=service.attrs.get('Spec', {}).get('Mode', {}),
-                image=service.attrs.get('Spec', {}).get('TaskTemplate', {}).get('ContainerSpec', {}).get('Image', ''),
-                ports=ports,
-                replicas=service.attrs.get('Spec', {}).get('Mode', {}).get('Replicated', {}).get('Replicas', 5),
-                running_replicas=sum(1 for task in tasks if task['Status']['State'] == 'running'),
-                deployed_to=node_hostnames
-            )
-            service_details.append(service_detail)
-
-        return service_details
+            key = (self._get_version(service.attrs), self._get_tasks_signature(self.get_tasks_for_service(service.id)), nodes_signature)
+            cached = self.service_statuses.get(service.id)
+            if cached is not None and cached[0] == key and key[0] is not None:
+                service_statuses[service.id] = cached
+            else:
+                service_statuses[service.id] = (key, self._build_service_status(service))
+
+        # Entries of removed services are dropped with the previous generation
+        self.service_statuses = service_statuses
+        return [status for _, status in service_statuses.values()]
+
+    def _build_service_status(self, service: Any) -> DockerStatus:
+        ports = []
+        if 'Ports' in service.attrs.get('Endpoint', {}):
+            for port in service.attrs['Endpoint']['Ports']:
+                ports.append({
+                    'published': port.get('PublishedPort'),
+                    'target': port.get('TargetPort'),
+                    'protocol': port.get('Protocol')
+                })
+
+        tasks = self.get_tasks_for_service(service.id)
+        node_hostnames = [self.node_hostnames_by_id.get(node.id, '') for node in self._get_nodes_for_service(service.id)]
+
+        service_detail = DockerStatus(
+            name=service.name,
+            namespace=service.attrs.get('Spec', {}).get('Labels', {}).get('com.docker.stack.namespace', ''),
+            id=service.id,
+            created=service.attrs.get('CreatedAt', ''),
+            updated=service.attrs.get('UpdatedAt', ''),
+            mode=service.attrs.get('Spec', {}).get('Mode', {}),
+            image=service.attrs.get('Spec', {}).get('TaskTemplate', {}).get('ContainerSpec', {}).get('Image', ''),
+            ports=ports,
+            replicas=service.attrs.get('Spec', {}).get('Mode', {}).get('Replicated', {}).get('Replicas', 5),
+            running_replicas=sum(1 for task in tasks if task['Status']['State'] == 'running'),
+            deployed_to=node_hostnames
+        )
+        return service_detail
 
     def get_open_ports(self) -> list[int]:
+        return self._get_derived_view(('open_ports',), self._get_open_ports)
+
+    def _get_open_ports(self) -> list[int]:
         ports = []
         for service in self.services:
             if 'Ports' in service.attrs.get('Endpoint', {}):
@@ -115,8 +274,7 @@ class DockerService:
         while self.running:
             try:
                 logging.debug("Updating Docker stats")
-                self.nodes = self.client.nodes.list()
-                self.services = self.client.services.list()
+                self._refresh()
                 self._is_healthy = True
             except KeyboardInterrupt:
                 logging.warning("Update interrupted by user")
@@ -125,7 +283,26 @@ class DockerService:
                 logging.error(f"Error pinging Docker daemon: %s", e)
                 self._is_healthy = False
             finally:
-                time.sleep(DOCKER_UPDATE_INTERVAL_S)
+                self.stop_event.wait(self.update_interval)
+
+    def _docker_events_task(self) -> None:
+        logging.debug("Docker events thread is starting up")
+        while self.running:
+            try:
+                self.events = self.client.events(decode=True, filters=DOCKER_EVENT_FILTERS)
+                # Catch up with anything that happened while the stream was not connected
+                self._refresh()
+                for event in self.events:
+                    if not self.running:
+                        break
+                    self._apply_event(event)
+            except Exception as e:
+                if not self.running:
+                    break
+                logging.error("Error reading Docker events: %s", e)
+                self._is_healthy = False
+                self.stop_event.wait(DOCKER_UPDATE_INTERVAL_S)
+        logging.debug("Docker events thread has finished")
 
     def is_busy(self) -> bool:
         if len(self.nodes) <= 0:
@@ -138,27 +315,23 @@ class DockerService:
     def __close__(self) -> None:
         logging.debug("Closing DockerStats update thread")
         self.running = False
+        self.stop_event.set()
+        if self.events is not None:
+            self.events.close()
         self.thread.join()
         logging.info("Thread %s: finishing", self.thread.name)
+        if self.events_thread is not None:
+            self.events_thread.join()
+            logging.info("Thread %s: finishing", self.events_thread.name)
 
     def get_tasks_for_service(self, service_id: str) -> list:
-        return self.low_level_client.tasks(filters={"service": service_id})
+        return self.tasks_by_service.get(service_id, [])
 
     def _get_nodes_for_service(self, service_id: str) -> list:
-        service_tasks = self.get_tasks_for_service(service_id)
-        nodes = []
-        node_ids = []
-        for task in service_tasks:
-            if task['Status']['State'] != 'running':
-                continue
-            node_ids.append(task.get('NodeID'))
-
-        for node in self.nodes:
-            if node.id not in node_ids:
-                continue
-            nodes.append(node)
+        node_ids = {task.get('NodeID') for task in self.get_tasks_for_service(service_id)
+                    if task['Status']['State'] == 'running'}
 
-        return nodes
+        return [node for node in self.nodes if node.id in node_ids]
 
     def is_healthy(self) -> bool:
         if not self._is_healthy:
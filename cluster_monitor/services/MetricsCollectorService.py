@@ -0,0 +1,85 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import dataclasses
+import logging
+import threading
+import time
+
+from typing import Any, Callable
+from cluster_monitor.dto import MetricsSnapshot, ClusterHatStatus
+from cluster_monitor.services.RpiService import RpiService
+
+METRIC_CLUSTER_HAT_INTERVAL_S = 5
+METRIC_FAN_INTERVAL_S = 5
+METRIC_IP_ADDRESS_INTERVAL_S = 60
+METRIC_RPI_STATS_INTERVAL_S = 5
+METRIC_DISK_USAGE_INTERVAL_S = 30
+
+class MetricsCollectorService:
+    def __init__(self, rpi_service: RpiService):
+        self.rpi_service = rpi_service
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.failed_metrics = set()
+        self.collectors = {
+            'cluster_hat_status': (METRIC_CLUSTER_HAT_INTERVAL_S, self.rpi_service.get_clusterhat_status),
+            'is_fan_on': (METRIC_FAN_INTERVAL_S, self.rpi_service.is_fan_on),
+            'ip_address': (METRIC_IP_ADDRESS_INTERVAL_S, self.rpi_service.get_ip_address),
+            'rpi_stats': (METRIC_RPI_STATS_INTERVAL_S, self.rpi_service.render_stats),
+            'disk_usages': (METRIC_DISK_USAGE_INTERVAL_S, lambda: tuple(self.rpi_service.get_disk_usages())),
+        }
+        self.snapshot = MetricsSnapshot(
+            cluster_hat_status=ClusterHatStatus(is_on=False, has_alert=False, active_node_count=0),
+            is_fan_on=False,
+            ip_address="N/A",
+            rpi_stats="",
+            disk_usages=tuple(),
+            timestamp=0.0
+        )
+
+        logging.debug("Collecting initial metrics snapshot...")
+        for name, (_, collect) in self.collectors.items():
+            self._collect(name, collect)
+
+        self.threads = []
+        for name, (interval, collect) in self.collectors.items():
+            thread = threading.Thread(target=self._metric_collector_task, kwargs={'name': name, 'interval': interval, 'collect': collect}, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+            logging.info("Metric [%s] collector thread [%s] started.", name, thread.name)
+
+    def _collect(self, name: str, collect: Callable[[], Any]) -> None:
+        try:
+            value = collect()
+            with self.lock:
+                self.snapshot = dataclasses.replace(self.snapshot, **{name: value, 'timestamp': time.time()})
+                self.failed_metrics.discard(name)
+        except Exception as e:
+            logging.error(f"Error collecting metric %s: %s", name, e)
+            with self.lock:
+                self.failed_metrics.add(name)
+
+    def _metric_collector_task(self, name: str, interval: float, collect: Callable[[], Any]) -> None:
+        logging.debug("Metric [%s] collector thread is starting up", name)
+        while not self.stop_event.wait(interval):
+            self._collect(name, collect)
+        logging.debug("Metric [%s] collector thread has finished", name)
+
+    def get_snapshot(self) -> MetricsSnapshot:
+        return self.snapshot
+
+    def __close__(self) -> None:
+        logging.debug("Closing metrics collector threads")
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+            logging.info("Thread %s: finishing", thread.name)
+
+    def is_healthy(self) -> bool:
+        with self.lock:
+            failed_metrics = sorted(self.failed_metrics)
+        if len(failed_metrics) > 0:
+            logging.error("Metrics collector is not healthy, failing metrics: %s", failed_metrics)
+            return False
+        return True
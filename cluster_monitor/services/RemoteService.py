@@ -2,149 +2,348 @@
 # -*- coding:utf-8 -*-
 
 import logging
+import random
+import socket
 import uuid
 import paramiko
 import time
 import threading
 
+from concurrent.futures import ThreadPoolExecutor, wait
 from natsort import natsorted
 from typing import Optional
-from cluster_monitor.dto import AsyncCommand, AsyncCommandCache
+from cluster_monitor.dto import AsyncCommand, AsyncCommandCache, NodeStats
+from cluster_monitor.helpers.AgentFrame import AgentFrame
+from cluster_monitor.services.SshConnectionPool import SshConnectionPool
 
 EXTERNAL_UPDATE_INTERVAL_S = 2
+REMOTE_MAX_WORKERS = 8
+REMOTE_COMMAND_TIMEOUT_S = 10
+# A host that timed out keeps showing its previous result for at most this many sweeps in a row
+REMOTE_MAX_MISSED_SWEEPS = 3
+BATCH_OUTPUT_MARKER = '--cluster-monitor-batch--'
+# Spread command schedules by +/- 20% so periodic sweeps do not line up
+REMOTE_SCHEDULE_JITTER = 0.2
+# An agent that stays silent this long is considered stuck and gets restarted
+AGENT_READ_TIMEOUT_S = 30
 
 class RemoteService:
     def __init__(self, hostnames:list[str], username: str, ssh_key_path: str):
-        self.username = username
-        self.ssh_key_path = ssh_key_path
         self.lock = threading.Lock()
-        self.clients = dict()
-        self._connect_all(hostnames)
+        self.host_locks = dict()
+        self.host_channels = dict()
+        self.host_missed_sweeps = dict()
+        self.executor = ThreadPoolExecutor(max_workers=REMOTE_MAX_WORKERS, thread_name_prefix="RemoteService")
         self.async_commands = AsyncCommand()
+        self.connection_pool = SshConnectionPool(username, ssh_key_path, self.async_commands.remove_result)
+        self._connect_all(hostnames)
+        self.agent_command = None
+        self.agent_record_uuids = {}
+        self.agent_lock = threading.Lock()
+        self.results_lock = threading.Lock()
+        self.agent_streams = {}
+        self.node_stats = {}
+        self.batched_uuids = []
+        self.batch_thread = threading.Thread(target=self._batch_update_task, daemon=True)
         self.is_update_processing = False
         logging.info(f"Connected to {len(self.clients)} remote hosts")
 
-    def _connect(self, hostname: str) -> paramiko.SSHClient:
-        logging.debug(f"Connecting to {hostname}...")
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Use the provided SSH key for authentication
-        ssh_client.connect(
-            hostname,
-            username=self.username,
-            key_filename=self.ssh_key_path,
-            timeout=10
-        )
-        ssh_client.get_transport().set_keepalive(30)
-        logging.info(f"Connected to {hostname}")
-
-        return ssh_client
-
-    def _is_ssh_client_closed(self, ssh_client: paramiko.SSHClient) -> bool:
-        transport = ssh_client.get_transport()
-        return not (transport and transport.is_active())
-
-    def __remove_client(self, hostname: str) -> None:
-        if hostname not in self.clients:
-            return
-
-        logging.debug(f"Disconnecting from %s...", hostname)
-        client = self.clients.pop(hostname)
-        if client:
-            client.close()
-        self.async_commands.remove_result(hostname)
-        logging.info(f"Disconnected from %s",  hostname)
+    @property
+    def clients(self) -> dict[str, paramiko.SSHClient]:
+        return self.connection_pool.clients
 
+    def _get_host_lock(self, hostname: str) -> threading.Lock:
+        with self.lock:
+            return self.host_locks.setdefault(hostname, threading.Lock())
 
     def _connect_all(self, hostnames: list[str]) -> None:
-        if len(self.clients) > len(hostnames):
-            logging.info("Removing disconnected clients... %s, %s", self.clients.keys(), hostnames)
-            running_clients_hostnames = list(self.clients.keys())
-            for active_client_hostname in running_clients_hostnames:
-                if active_client_hostname not in hostnames:
-                    self.__remove_client(active_client_hostname)
-
-        for active_client_hostname in hostnames:
-            if active_client_hostname in self.clients and self._is_ssh_client_closed(self.clients[active_client_hostname]):
-                self.__remove_client(active_client_hostname)
-
-            if active_client_hostname not in self.clients:
-                try:
-                    self.clients[active_client_hostname] = self._connect(active_client_hostname)
-                except Exception as e:
-                    logging.error(f"Error connecting to host {active_client_hostname}: {e}")
+        self.connection_pool.connect_all(hostnames)
 
     def __close__(self) -> None:
         self.async_commands.__close__()
-        logging.info("Closing SSH connections...")
-        for client in self.clients.values():
-            if client:
-                client.close()
-
-    def __create_command_background_thread(self, command_uuid: str) -> threading.Thread:
-        return threading.Thread(target=self._command_update_task, kwargs={'command_uuid': command_uuid}, daemon=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.connection_pool.__close__()
 
-    def attach_command(self, command: str, command_uuid: Optional[str] = None) -> str:
+    def attach_command(self, command: str, command_uuid: Optional[str] = None, interval_sec: float = EXTERNAL_UPDATE_INTERVAL_S) -> str:
         command_uuid = command_uuid if command_uuid is not None else str(uuid.uuid5(uuid.NAMESPACE_DNS, command))
         self.async_commands[command_uuid] = AsyncCommandCache(
             command_uuid,
             command,
             True,
             {},
-           self.__create_command_background_thread(command_uuid)
+            self.batch_thread,
+            interval_sec,
+            # Start within the first 20% of the interval so commands attached together do not run in lockstep.
+            # Not any later: the display shows the loading screen until every command has a first result.
+            time.monotonic() + random.uniform(0, interval_sec * REMOTE_SCHEDULE_JITTER)
         )
         logging.info(f"Attached command %s [%s] to async commands cache", command, command_uuid)
         return command_uuid
 
-    def _execute(self, hostname: str, command: str) -> str:
-        stdin, stdout, stderr = self.clients[hostname].exec_command(command)
-        output = stdout.read().decode().strip()  # Decode and clean output
-        error = stderr.read().decode().strip()  # Capture errors (if any)
+    def attach_agent(self, command: str, record_kinds: list[str]) -> dict[str, str]:
+        self.agent_command = command
+        agent_thread = threading.Thread(target=self._agent_supervisor_task, daemon=True)
+        for kind in record_kinds:
+            command_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{command}#{kind}"))
+            # Every record kind gets its own results cache, all of them fed by the same agent streams
+            self.async_commands[command_uuid] = AsyncCommandCache(command_uuid, command, True, {}, agent_thread)
+            self.agent_record_uuids[kind] = command_uuid
+        agent_thread.start()
+        logging.info(f"Attached agent command %s with records %s", command, record_kinds)
+        return dict(self.agent_record_uuids)
+
+    def _is_agent_running(self) -> bool:
+        return all(self.async_commands[command_uuid].running for command_uuid in self.agent_record_uuids.values())
+
+    def _publish_agent_result(self, command_uuid: str, hostname: str, payload: Optional[str]) -> None:
+        # Results are replaced, never changed in place, so readers can keep iterating the dict they got
+        command = self.async_commands[command_uuid]
+        with self.results_lock:
+            results = {key: value for key, value in command.results.items() if key != hostname}
+            if payload is not None:
+                results[hostname] = payload
+            command.results = results
+
+    def _agent_supervisor_task(self) -> None:
+        logging.debug(f"Agent command %s supervisor thread is starting", self.agent_command)
+        while self._is_agent_running():
+            for hostname in list(self.clients.keys()):
+                with self.agent_lock:
+                    # A stopped agent shares its host's backoff with the SSH connection
+                    if hostname in self.agent_streams or self.connection_pool.is_host_backing_off(hostname):
+                        continue
+                    self.agent_streams[hostname] = None
+                threading.Thread(target=self._agent_stream_task, kwargs={'hostname': hostname}, daemon=True).start()
+            time.sleep(EXTERNAL_UPDATE_INTERVAL_S)
+
+        with self.agent_lock:
+            channels = list(self.agent_streams.values())
+        for channel in channels:
+            if channel:
+                channel.close()
+        logging.debug(f"Agent command %s supervisor thread has finished", self.agent_command)
+
+    def _agent_stderr_task(self, hostname: str, stderr) -> None:
+        # The agent logs to stderr, keep reading it so a full channel window never stalls the stats stream
+        while not stderr.channel.closed:
+            try:
+                line = stderr.readline()
+            except socket.timeout:
+                continue
+            except Exception as e:
+                logging.debug("Agent stderr on host %s closed: %s", hostname, e)
+                break
+            if not line:
+                break
+            logging.debug("Agent on host %s: %s", hostname, line.rstrip())
+
+    def _agent_stream_task(self, hostname: str) -> None:
+        logging.debug("Starting agent stream on host %s", hostname)
+        started = time.monotonic()
+        try:
+            stdin, stdout, stderr = self.connection_pool.get_client(hostname).exec_command(self.agent_command, timeout=AGENT_READ_TIMEOUT_S)
+            with self.agent_lock:
+                self.agent_streams[hostname] = stdout.channel
+            threading.Thread(target=self._agent_stderr_task, kwargs={'hostname': hostname, 'stderr': stderr}, daemon=True).start()
+            while self._is_agent_running():
+                record = AgentFrame.read(stdout)
+                if record is None:
+                    break
+                kind, payload = record
+                if kind in self.agent_record_uuids:
+                    self._publish_agent_result(self.agent_record_uuids[kind], hostname, payload)
+                if time.monotonic() - started > AGENT_READ_TIMEOUT_S:
+                    # Only an agent that kept streaming for a while counts as recovered
+                    self.connection_pool.clear_failures(hostname)
+        except Exception as e:
+            logging.error("Agent stream on host %s failed: %s", hostname, e)
+        finally:
+            # Whatever the agent sent last is no longer live, do not keep showing it
+            for command_uuid in self.agent_record_uuids.values():
+                self._publish_agent_result(command_uuid, hostname, None)
+            with self.agent_lock:
+                channel = self.agent_streams.pop(hostname, None)
+                if self._is_agent_running():
+                    self.connection_pool.record_failure(hostname)
+            if channel:
+                channel.close()
+            logging.debug("Agent stream on host %s has finished", hostname)
 
+    def _execute(self, hostname: str, command: str) -> str:
+        host_lock = self._get_host_lock(hostname)
+        # A previous sweep may still be stuck on this host, do not queue up behind it forever
+        if not host_lock.acquire(timeout=REMOTE_COMMAND_TIMEOUT_S):
+            raise TimeoutError(f"Host {hostname} is still busy with a previous command")
+        try:
+            stdin, stdout, stderr = self.connection_pool.get_client(hostname).exec_command(command, timeout=REMOTE_COMMAND_TIMEOUT_S)
+            self.host_channels[hostname] = stdout.channel
+            try:
+                output = stdout.read().decode().strip()  # Decode and clean output
+                error = stderr.read().decode().strip()  # Capture errors (if any)
+            except (TimeoutError, socket.timeout):
+                stdout.channel.close()
+                raise
+        finally:
+            self.host_channels.pop(hostname, None)
+            host_lock.release()
+
+        # Batched commands are judged by the exit status on their end marker, stderr alone is not a failure
         if error:
-            raise Exception(f"Error executing command: {error}")
+            logging.warning("Command on host %s wrote to stderr: %s", hostname, error)
         return output
 
-    def _execute_on_all(self, command: str) -> dict[str, str]:
+    def _record_missed_sweep(self, hostname: str) -> None:
+        missed_sweeps = self.host_missed_sweeps.get(hostname, 0) + 1
+        self.host_missed_sweeps[hostname] = missed_sweeps
+        if missed_sweeps == REMOTE_MAX_MISSED_SWEEPS + 1:
+            logging.warning("Host %s missed %d sweeps in a row, dropping its stale results", hostname, REMOTE_MAX_MISSED_SWEEPS)
+
+    def _is_previous_result_usable(self, hostname: str) -> bool:
+        return self.host_missed_sweeps.get(hostname, 0) <= REMOTE_MAX_MISSED_SWEEPS
+
+    def _execute_on_all(self, command: str, previous_results: Optional[dict[str, str]] = None) -> dict[str, str]:
         results = {}
         active_client_hostnames = list(self.clients.keys())
-        for hostname in active_client_hostnames:
+        futures = {hostname: self.executor.submit(self._execute, hostname, command) for hostname in active_client_hostnames}
+        # Hosts run side by side, so a sweep takes as long as the slowest host up to the timeout
+        wait(futures.values(), timeout=REMOTE_COMMAND_TIMEOUT_S)
+        for hostname, future in futures.items():
+            if not future.done():
+                logging.warning("Command on host %s timed out, keeping its previous result", hostname)
+                # Free the worker, a stuck host must not hold on to a slot of the shared pool
+                if not future.cancel():
+                    channel = self.host_channels.get(hostname)
+                    if channel is not None:
+                        channel.close()
+                self._record_missed_sweep(hostname)
+                if previous_results and hostname in previous_results and self._is_previous_result_usable(hostname):
+                    results[hostname] = previous_results[hostname]
+                continue
+
             try:
-                results[hostname] = self._execute(hostname, command)
+                results[hostname] = future.result()
+                self.host_missed_sweeps.pop(hostname, None)
+            except (TimeoutError, socket.timeout) as e:
+                # socket.timeout is only an alias of TimeoutError from Python 3.10 on
+                logging.warning("Command on host %s timed out: %s", hostname, e)
+                self._record_missed_sweep(hostname)
+                if previous_results and hostname in previous_results and self._is_previous_result_usable(hostname):
+                    results[hostname] = previous_results[hostname]
             except Exception as e:
                 logging.error(f"Error executing command on host %s: %s", hostname, e)
-                self.__remove_client(hostname)
+                self.host_missed_sweeps.pop(hostname, None)
+                self.connection_pool.remove(hostname)
+                self.connection_pool.record_failure(hostname)
         return results
 
     def execute_on_all_async(self, command_uuid: str = None) -> None:
-        self.async_commands[command_uuid].thread.start()
+        if command_uuid not in self.batched_uuids:
+            self.batched_uuids.append(command_uuid)
+        # All attached commands share one sweep thread, started with the first of them
+        if self.batch_thread.ident is None:
+            self.batch_thread.start()
 
     def get_async_results(self, command_uuid: Optional[str]) -> dict[str, str]:
         if command_uuid not in self.async_commands:
             return {}
 
-        results = self.async_commands[command_uuid].results
+        with self.results_lock:
+            results = dict(self.async_commands[command_uuid].results)
         return {k: results[k] for k in natsorted(results.keys())}
 
-    def _command_update_task(self, command_uuid) -> None:
-        if command_uuid not in self.async_commands:
-            raise Exception(f"Command update thread for command [%s] not found in async commands cache", uuid)
-
-        command = self.async_commands[command_uuid].command
-        logging.debug(f"Command %s [%s] results update thread is starting", command, uuid)
-        while self.async_commands[command_uuid].running:
+    def get_async_node_stats(self, command_uuid: Optional[str]) -> dict[str, NodeStats]:
+        results = self.get_async_results(command_uuid)
+        # Hosts without a result anymore would otherwise stay in the cache forever
+        for key in [key for key in self.node_stats if key[0] == command_uuid and key[1] not in results]:
+            self.node_stats.pop(key, None)
+
+        node_stats = {}
+        for hostname, result in results.items():
+            # Results only change once per sweep, parse each payload once, whether it is valid or not
+            cached = self.node_stats.get((command_uuid, hostname))
+            if cached is None or cached[0] != result:
+                try:
+                    stats = NodeStats.from_json(result)
+                except Exception as e:
+                    logging.error("Invalid stats from host %s: %s", hostname, e)
+                    stats = None
+                cached = self.node_stats[(command_uuid, hostname)] = (result, stats)
+            if cached[1] is not None:
+                node_stats[hostname] = cached[1]
+        return node_stats
+
+    def _build_batch_command(self, commands: list[AsyncCommandCache]) -> str:
+        # Every command output is wrapped in begin/end marker lines, the end marker carries the exit status.
+        # Commands run in subshells so an exit in one of them does not cut the batch short.
+        parts = []
+        for command in commands:
+            parts.append(f"printf '%s %s\\n' '{BATCH_OUTPUT_MARKER}' '{command.uuid}'; "
+                         f"( {command.command} ); "
+                         f"printf '\\n%s %s %s\\n' '{BATCH_OUTPUT_MARKER}' '{command.uuid}' \"$?\"")
+        return "; ".join(parts)
+
+    def _split_batch_output(self, output: str) -> dict[str, str]:
+        outputs = {}
+        command_uuid = None
+        lines = []
+        for line in output.splitlines():
+            if not line.startswith(BATCH_OUTPUT_MARKER):
+                if command_uuid is not None:
+                    lines.append(line)
+                continue
+
+            fields = line.split()
+            if len(fields) == 2:
+                command_uuid, lines = fields[1], []
+            elif len(fields) == 3 and fields[1] == command_uuid:
+                if fields[2] == '0':
+                    outputs[command_uuid] = "\n".join(lines).strip()
+                else:
+                    logging.error("Command [%s] exited with status %s", command_uuid, fields[2])
+                command_uuid = None
+        return outputs
+
+    def _execute_batch_on_all(self, commands: list[AsyncCommandCache]) -> None:
+        outputs = {hostname: self._split_batch_output(output)
+                   for hostname, output in self._execute_on_all(self._build_batch_command(commands)).items()}
+        for command in commands:
+            results = {}
+            previous_results = command.results
+            for hostname in outputs.keys() | previous_results.keys():
+                if hostname in outputs:
+                    result = outputs[hostname].get(command.uuid)
+                    if result is not None:
+                        results[hostname] = result
+                elif hostname in self.clients and self._is_previous_result_usable(hostname):
+                    # Host is still connected but timed out, keep showing its previous result for a few sweeps
+                    results[hostname] = previous_results[hostname]
+            with self.results_lock:
+                command.results = results
+
+    def _is_batch_running(self) -> bool:
+        return any(self.async_commands[command_uuid].running for command_uuid in self.batched_uuids)
+
+    def _batch_update_task(self) -> None:
+        logging.debug("Batched commands results update thread is starting")
+        while self._is_batch_running():
             try:
-                self.lock.acquire()
-                self.async_commands[command_uuid].results = self._execute_on_all(command)
-                logging.debug("Updated results for command %s", command)
+                now = time.monotonic()
+                commands = [self.async_commands[command_uuid] for command_uuid in list(self.batched_uuids)]
+                due_commands = [command for command in commands if command.running and command.next_update_time <= now]
+                if due_commands:
+                    self._execute_batch_on_all(due_commands)
+                    for command in due_commands:
+                        jitter = random.uniform(1 - REMOTE_SCHEDULE_JITTER, 1 + REMOTE_SCHEDULE_JITTER)
+                        command.next_update_time = now + command.interval_sec * jitter
+                    logging.debug("Updated results for commands %s", [command.command for command in due_commands])
+                commands = [self.async_commands[command_uuid] for command_uuid in list(self.batched_uuids)]
+                next_update_time = min([command.next_update_time for command in commands if command.running], default=now)
+                time.sleep(min(max(next_update_time - time.monotonic(), 0.1), EXTERNAL_UPDATE_INTERVAL_S))
             except KeyboardInterrupt:
                 logging.warning("Update command results interrupted by user")
-                self.async_commands[command_uuid].running = False
-            finally:
-                self.lock.release()
-                time.sleep(EXTERNAL_UPDATE_INTERVAL_S)
-        logging.debug(f"Command %s [%s] results update thread has finished", command, command_uuid)
+                for command_uuid in self.batched_uuids:
+                    self.async_commands[command_uuid].running = False
+        logging.debug("Batched commands results update thread has finished")
 
     def _are_hostnames_changed(self, new_hostnames: list[str]) -> bool:
         if len(new_hostnames) != len(self.clients):
@@ -181,12 +380,7 @@ class RemoteService:
 
 
     def is_healthy(self) -> bool:
-        for client in self.clients.values():
-            if self._is_ssh_client_closed(client):
-                logging.error("At least one SSH client is closed")
-                return False
-
-        return True
+        return self.connection_pool.is_healthy()
 
 
 
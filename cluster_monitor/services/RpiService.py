@@ -10,13 +10,24 @@ import re
 from time import sleep
 import threading
 
-from cluster_monitor.dto import ClusterHatStatus, DiskUsageInfo
+from typing import Optional
+from cluster_monitor.dto import ClusterHatStatus, DiskUsageInfo, CpuUsage, NodeStats
+from cluster_monitor.helpers.CpuSampler import CpuSampler
 
 RPI_TIME_FORMAT = "%H:%M"
+CLUSTER_HAT_STATUS_TTL_S = 2
+LOG_LINE_PATTERN = re.compile(r'^.*?(\d{2}:\d{2}):\d{2},\d{3} \[(\w+)].*?: (.*)$')
+LOG_THREAD_PREFIX_PATTERN = re.compile(r"\[?(?:Thread-\d+|MainThread).*\]?: ?")
+LOG_THREAD_SUFFIX_PATTERN = re.compile(r"\[Thread-\d+.*\]")
 
 class RpiService:
-    def __init__(self):
+    def __init__(self, cpu_sampler_state_path: Optional[str] = None):
+        self.cpu_sampler = CpuSampler(cpu_sampler_state_path)
+        self.cluster_hat_status_lock = threading.Lock()
+        self.cluster_hat_status = None
+        self.cluster_hat_status_time = 0.0
         self.cluster_hat_alert_enabled = False
+        self.log_readers = {}
         self.set_cluster_hat_alert(False)
 
     def get_current_time(self) -> str:
@@ -41,6 +52,9 @@ class RpiService:
             logging.debug(f"Error checking WiFi status: {e}")
             return False
 
+    def get_ip_address(self) -> str:
+        return self._get_my_ip_address()
+
     def _get_my_ip_address(self) -> str:
         try:
             output = subprocess.check_output(['ifconfig'], text=True)
@@ -109,37 +123,16 @@ class RpiService:
             logging.debug(f"Error calculating memory usage percentage: {e}")
             return 0.0
 
-    def _get_cpu_usage_percentage(self) -> float:
+    def get_cpu_usages(self) -> dict[str, CpuUsage]:
         try:
-            # Read initial CPU stats
-            with open('/proc/stat', 'r') as stat_file:
-                first_line = stat_file.readline()
-                stat_file.close()
-            cpu_stats_1 = list(map(int, first_line.split()[1:]))  # Skip the "cpu" keyword
-
-            # Wait 100ms to calculate CPU usage over time
-            time.sleep(0.1)
-
-            # Read CPU stats again
-            with open('/proc/stat', 'r') as stat_file:
-                first_line = stat_file.readline()
-            cpu_stats_2 = list(map(int, first_line.split()[1:]))
-
-            # Calculate total work and total time differences
-            idle_time_1, idle_time_2 = cpu_stats_1[3], cpu_stats_2[3]
-            total_time_1, total_time_2 = sum(cpu_stats_1), sum(cpu_stats_2)
-
-            work_time = (total_time_2 - total_time_1) - (idle_time_2 - idle_time_1)
-            total_time = total_time_2 - total_time_1
-
-            # Calculate CPU usage percentage
-            cpu_usage = (work_time / total_time) * 100 if total_time > 0 else 0.0
-
-            return round(cpu_usage, 1)  # Round to 2 decimal places
-
+            return self.cpu_sampler.sample()
         except Exception as e:
             logging.debug(f"Error reading CPU usage: {e}")
-            return 0.0  # Return 0% on error
+            return {}
+
+    def _get_cpu_usage_percentage(self) -> float:
+        cpu_usage = self.get_cpu_usages().get('cpu')
+        return cpu_usage.usage_percentage if cpu_usage is not None else 0.0  # Return 0% on error
 
     def __get_path_usage_info(self, path: str) -> DiskUsageInfo:
         try:
@@ -169,6 +162,23 @@ class RpiService:
             return 0.0
 
     def get_clusterhat_status(self) -> ClusterHatStatus:
+        # Callers arriving while the command runs wait on the lock and share its result
+        with self.cluster_hat_status_lock:
+            status = self.cluster_hat_status
+            if status is not None and time.monotonic() - self.cluster_hat_status_time < CLUSTER_HAT_STATUS_TTL_S:
+                return status
+
+            status = self._read_clusterhat_status()
+            self.cluster_hat_status = status
+            self.cluster_hat_status_time = time.monotonic()
+            return status
+
+    def _invalidate_clusterhat_status(self) -> None:
+        # Waits for a status read in progress, so a result read during a mutating command is dropped as well
+        with self.cluster_hat_status_lock:
+            self.cluster_hat_status = None
+
+    def _read_clusterhat_status(self) -> ClusterHatStatus:
         try:
             with subprocess.Popen(
                     ['clusterhat', 'status'],
@@ -229,33 +239,43 @@ class RpiService:
         return disk_usage_info
 
     def render_cluster_hat_status(self) -> str:
-        status = self.get_clusterhat_status()
+        return self.format_cluster_hat_status(self.get_clusterhat_status(), self.is_fan_on(), self._get_my_ip_address())
 
-        return f"C: {'Y' if status.is_on else 'N'} - N: {status.active_node_count}/5 - F: {'Y' if self.is_fan_on() else 'N'} - {self._get_my_ip_address()}"
+    def format_cluster_hat_status(self, status: ClusterHatStatus, is_fan_on: bool, ip_address: str) -> str:
+        return f"C: {'Y' if status.is_on else 'N'} - N: {status.active_node_count}/5 - F: {'Y' if is_fan_on else 'N'} - {ip_address}"
 
-    def render_stats(self) -> str:
-        cpu_usage = self._get_cpu_usage_percentage()
-        ram_usage = self._get_ram_usage_percentage()
+    def get_node_stats(self, disks: Optional[list[str]] = None) -> NodeStats:
         temperature = self.get_temperature()
-        is_fan_on = self.is_fan_on()
-        hdd_usage = self._get_local_disk_usage()
-        hostname = self.get_hostname().upper()
+        return NodeStats(
+            hostname=self.get_hostname(),
+            cpu_usage=self._get_cpu_usage_percentage(),
+            ram_usage=self._get_ram_usage_percentage(),
+            disk_usage=self._get_local_disk_usage(),
+            temperature=temperature if isinstance(temperature, float) else None,
+            is_fan_on=self.is_fan_on(),
+            disk_usages=self.get_disk_usages(disks) if disks else [],
+            timestamp=time.time()
+        )
 
-        return  f"{hostname} - C: {cpu_usage:3.0f}% M: {ram_usage:3.0f}% H: {hdd_usage:3.0f}% T: {temperature:4.1f}°C{' [F]' if is_fan_on else ''}"
+    def render_stats(self) -> str:
+        return self.get_node_stats().render()
 
     def get_lines_from_file(self, filename: str, nr_lines: int = 10) -> list[str]:
         try:
-            lines = []
-            with open(filename, 'r') as file:
-                lines = file.readlines()[-nr_lines:]
-                file.close()
-            return [line.rstrip() for line in lines]
+            # Readers keep their offset between calls, so only appended lines are read
+            reader = self.log_readers.get((filename, nr_lines))
+            if reader is None:
+                # Only the manager reads log files, keep the reader off the monitor client import path
+                from cluster_monitor.helpers.LogTailReader import LogTailReader
+                reader = self.log_readers[(filename, nr_lines)] = LogTailReader(filename, nr_lines)
+            return reader.read_lines()
         except Exception as e:
             logging.error(f"Error reading file {filename}: {e}")
             return ""
 
-    def is_healthy(self) -> bool:
-        status = self.get_clusterhat_status()
+    def is_healthy(self, status: Optional[ClusterHatStatus] = None) -> bool:
+        if status is None:
+            status = self.get_clusterhat_status()
         is_healthy = not status.is_on or status.active_node_count == 5
 
         if not is_healthy:
@@ -278,6 +298,7 @@ class RpiService:
                     text=True
             ) as process:
                 output, error = process.communicate()
+                self._invalidate_clusterhat_status()
                 # Check for a non-zero return code
                 if process.returncode != 0:
                     raise Exception(f"ClusterHat off command failed: {error}")
@@ -291,6 +312,7 @@ class RpiService:
                 ) as process:
                     output, error = process.communicate()
 
+                self._invalidate_clusterhat_status()
                 # Check for a non-zero return code
                 if process.returncode != 0:
                     raise Exception(f"ClusterHat on command failed: {error}")
@@ -306,6 +328,7 @@ class RpiService:
         try:
             status = 'on' if enable else 'off'
             subprocess.check_call(['clusterhat', 'alert', status])
+            self._invalidate_clusterhat_status()
         except subprocess.CalledProcessError as e:
             logging.error(f"Failed to set clusterhat alert to {status}: {e}")
             raise RuntimeError(f'Failed to set clusterhat alert: {e}')
@@ -315,7 +338,7 @@ class RpiService:
         for line in lines:
             try:
                 # Regex to parse the log line
-                match = re.match(r'^.*?(\d{2}:\d{2}):\d{2},\d{3} \[(\w+)].*?: (.*)$', line)
+                match = LOG_LINE_PATTERN.match(line)
                 if match:
                     # Extract time, log level's first letter, and remainder log message
                     time = match.group(1)
@@ -323,8 +346,8 @@ class RpiService:
                     message = match.group(3)
 
                     # Remove various thread info patterns from the message
-                    message = re.sub(r"\[?(?:Thread-\d+|MainThread).*\]?: ?", "", message)
-                    message = re.sub(r"\[Thread-\d+.*\]", "", message)
+                    message = LOG_THREAD_PREFIX_PATTERN.sub("", message)
+                    message = LOG_THREAD_SUFFIX_PATTERN.sub("", message)
 
                     # Recreate the line
                     processed_lines.append(f"{time} [{log_level}] {message}")
@@ -0,0 +1,165 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+import logging
+import random
+import paramiko
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+SSH_CONNECT_TIMEOUT_S = 10
+SSH_KEEPALIVE_INTERVAL_S = 30
+SSH_PROBE_INTERVAL_S = 10
+SSH_MAX_CONNECT_WORKERS = 8
+SSH_BACKOFF_BASE_S = 2
+SSH_BACKOFF_MAX_S = 5 * 60
+SSH_BACKOFF_JITTER = 0.2
+
+class SshConnectionPool:
+    def __init__(self, username: str, ssh_key_path: str, on_remove: Optional[Callable[[str], None]] = None):
+        self.username = username
+        self.ssh_key_path = ssh_key_path
+        self.on_remove = on_remove
+        self.lock = threading.Lock()
+        self.connect_lock = threading.Lock()
+        self.clients = dict()
+        self.hostnames = []
+        self.host_failures = dict()
+        self._is_healthy = True
+        self.executor = ThreadPoolExecutor(max_workers=SSH_MAX_CONNECT_WORKERS, thread_name_prefix="SshConnectionPool")
+
+        self.running = True
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._probe_task, daemon=True)
+        self.thread.start()
+        logging.info("SSH connection probe thread [%s] started.", self.thread.name)
+
+    def _connect(self, hostname: str) -> paramiko.SSHClient:
+        logging.debug(f"Connecting to {hostname}...")
+        ssh_client = paramiko.SSHClient()
+        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+        # Use the provided SSH key for authentication
+        ssh_client.connect(
+            hostname,
+            username=self.username,
+            key_filename=self.ssh_key_path,
+            timeout=SSH_CONNECT_TIMEOUT_S
+        )
+        ssh_client.get_transport().set_keepalive(SSH_KEEPALIVE_INTERVAL_S)
+        logging.info(f"Connected to {hostname}")
+
+        return ssh_client
+
+    def _is_ssh_client_closed(self, ssh_client: paramiko.SSHClient) -> bool:
+        transport = ssh_client.get_transport()
+        return not (transport and transport.is_active())
+
+    def get_client(self, hostname: str) -> paramiko.SSHClient:
+        return self.clients[hostname]
+
+    def remove(self, hostname: str) -> None:
+        with self.lock:
+            client = self.clients.pop(hostname, None)
+        if client is None:
+            return
+
+        logging.debug(f"Disconnecting from %s...", hostname)
+        client.close()
+        if self.on_remove is not None:
+            self.on_remove(hostname)
+        logging.info(f"Disconnected from %s", hostname)
+
+    def record_failure(self, hostname: str) -> None:
+        failure_count = self.host_failures.get(hostname, (0, 0.0))[0] + 1
+        delay = min(SSH_BACKOFF_BASE_S * 2 ** (failure_count - 1), SSH_BACKOFF_MAX_S)
+        delay *= random.uniform(1 - SSH_BACKOFF_JITTER, 1 + SSH_BACKOFF_JITTER)
+        self.host_failures[hostname] = (failure_count, time.monotonic() + delay)
+        logging.info("Host %s failed %d time(s), next attempt in %.0f seconds", hostname, failure_count, delay)
+
+    def clear_failures(self, hostname: str) -> None:
+        self.clear_failures(hostname)
+
+    def is_host_backing_off(self, hostname: str) -> bool:
+        return hostname in self.host_failures and self.host_failures[hostname][1] > time.monotonic()
+
+    def _connect_host(self, hostname: str) -> None:
+        try:
+            client = self._connect(hostname)
+        except Exception as e:
+            logging.error(f"Error connecting to host {hostname}: {e}")
+            self.record_failure(hostname)
+            return
+
+        with self.lock:
+            self.clients[hostname] = client
+        self.host_failures.pop(hostname, None)
+
+    def connect_all(self, hostnames: list[str]) -> None:
+        self.hostnames = list(hostnames)
+        # Hostname updates and the probe thread may both ask for a reconnect, only one of them runs it
+        with self.connect_lock:
+            self._connect_all(hostnames)
+
+    def _connect_all(self, hostnames: list[str]) -> None:
+        for hostname in list(self.clients.keys()):
+            if hostname not in hostnames:
+                logging.info("Removing client of host %s, no longer part of %s", hostname, hostnames)
+                self.remove(hostname)
+
+        for hostname in hostnames:
+            if hostname in self.clients and self._is_ssh_client_closed(self.clients[hostname]):
+                self.remove(hostname)
+
+        pending_hostnames = [hostname for hostname in hostnames
+                             if hostname not in self.clients and not self.is_host_backing_off(hostname)]
+        # Hosts connect side by side, a dead node only costs its own connect timeout
+        wait([self.executor.submit(self._connect_host, hostname) for hostname in pending_hostnames])
+        self._update_health()
+
+    def _probe(self) -> None:
+        for hostname, client in list(self.clients.items()):
+            try:
+                if self._is_ssh_client_closed(client):
+                    raise ConnectionError("transport is not active")
+                client.get_transport().send_ignore()
+            except Exception as e:
+                logging.warning("SSH connection to host %s is not alive: %s", hostname, e)
+                self.remove(hostname)
+                self.record_failure(hostname)
+
+    def _update_health(self) -> None:
+        self._is_healthy = all(not self._is_ssh_client_closed(client) for client in list(self.clients.values()))
+
+    def _probe_task(self) -> None:
+        logging.debug("SSH connection probe thread is starting up")
+        while self.running:
+            try:
+                self._probe()
+                if any(hostname not in self.clients for hostname in self.hostnames):
+                    self.connect_all(self.hostnames)
+                self._update_health()
+            except Exception as e:
+                logging.error("Error probing SSH connections: %s", e)
+            finally:
+                self.stop_event.wait(SSH_PROBE_INTERVAL_S)
+        logging.debug("SSH connection probe thread has finished")
+
+    def is_healthy(self) -> bool:
+        if not self._is_healthy:
+            logging.error("At least one SSH client is closed")
+        return self._is_healthy
+
+    def __close__(self) -> None:
+        logging.debug("Closing SSH connection probe thread")
+        self.running = False
+        self.stop_event.set()
+        self.thread.join()
+        logging.info("Thread %s: finishing", self.thread.name)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logging.info("Closing SSH connections...")
+        for client in list(self.clients.values()):
+            client.close()
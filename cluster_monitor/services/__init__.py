@@ -4,4 +4,4 @@
 __version__ = "1.0.0"
 __author__ = "Ionut-Alexandru Banica"
 
-__all__ = ["RpiService", "DockerService", "RemoteService"]
+__all__ = ["RpiService", "DockerService", "RemoteService", "MetricsCollectorService", "SshConnectionPool"]
@@ -28,6 +28,7 @@
 #
 
 import logging
+from PIL import Image
 from . import epdconfig
 
 # Display resolution
@@ -39,6 +40,12 @@ GRAY2  = 0xC0
 GRAY3  = 0x80 #gray
 GRAY4  = 0x00 #Blackest
 
+# Per-pixel lookup used by getbuffer_4Gray: GRAY2 -> 0x80, GRAY3 -> 0x40, masked to the two packed bits
+GRAY4_PACK_TABLE = bytes(((0x80 if v == GRAY2 else 0x40 if v == GRAY3 else v) & 0xC0) for v in range(256))
+
+# spidev transfer buffer size (/sys/module/spidev/parameters/bufsiz defaults to 4096)
+SPI_MAX_CHUNK_SIZE = 4096
+
 logger = logging.getLogger(__name__)
 
 class EPD:
@@ -96,6 +103,14 @@ class EPD:
         epdconfig.digital_write(self.cs_pin, 0)
         epdconfig.spi_writebyte([data])
         epdconfig.digital_write(self.cs_pin, 1)
+
+    # send a lot of data
+    def send_data2(self, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        for offset in range(0, len(data), SPI_MAX_CHUNK_SIZE):
+            epdconfig.spi_writebyte2(data[offset:offset + SPI_MAX_CHUNK_SIZE])
+        epdconfig.digital_write(self.cs_pin, 1)
         
     def ReadBusy(self):        
         logger.debug("e-Paper busy")
@@ -129,8 +144,7 @@ class EPD:
         
     def Lut(self):
         self.send_command(0x32)
-        for i in range(159):
-            self.send_data(self.LUT_DATA_4Gray[i])
+        self.send_data2(self.LUT_DATA_4Gray[0:159])
     
     def init(self):
         if (epdconfig.module_init() != 0):
@@ -266,63 +280,36 @@ class EPD:
 
     def getbuffer(self, image):
         # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
         image_monocolor = image.convert('1')
         imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
         # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
         if(imwidth == self.width and imheight == self.height):
             logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
         elif(imwidth == self.height and imheight == self.width):
             logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
-    
+            # Rotating by 90 degrees maps (x, y) to (y, height - x - 1), the panel RAM layout
+            image_monocolor = image_monocolor.transpose(Image.ROTATE_90)
+        else:
+            return bytearray([0xFF] * (int(self.width/8) * self.height))
+        # Mode '1' packs 8 pixels per byte, MSB first, with black pixels as cleared bits
+        return bytearray(image_monocolor.tobytes())
+
     def getbuffer_4Gray(self, image):
         # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
         image_monocolor = image.convert('L')
         imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
         # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
         if(imwidth == self.width and imheight == self.height):
             logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-                        
         elif(imwidth == self.height and imheight == self.width):
             logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6) 
-        return buf
+            image_monocolor = image_monocolor.transpose(Image.ROTATE_90)
+        else:
+            return bytearray([0xFF] * (int(self.width / 4) * self.height))
+        # Remap GRAY2/GRAY3 and keep the top two bits of each pixel, then pack 4 pixels per byte
+        pixels = image_monocolor.tobytes().translate(GRAY4_PACK_TABLE)
+        return bytearray(p0 | p1 >> 2 | p2 >> 4 | p3 >> 6
+                         for p0, p1, p2, p3 in zip(pixels[0::4], pixels[1::4], pixels[2::4], pixels[3::4]))
     
     def Clear(self):
         if(self.width % 8 == 0):
@@ -331,9 +318,7 @@ class EPD:
             Width = self.width // 8 +1
         Height = self.height
         self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(0XFF)
+        self.send_data2([0XFF] * (Width * Height))
         self.TurnOnDisplay()
 
     def Clear_Fast(self):
@@ -343,9 +328,7 @@ class EPD:
             Width = self.width // 8 +1
         Height = self.height
         self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(0XFF)
+        self.send_data2([0XFF] * (Width * Height))
         self.TurnOnDisplay_Fast()
     
     def display(self, image):
@@ -355,9 +338,7 @@ class EPD:
             Width = self.width // 8 +1
         Height = self.height
         self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
+        self.send_data2(image[0:Width * Height])
         self.TurnOnDisplay()
         
     def display_Fast(self, image):
@@ -367,9 +348,7 @@ class EPD:
             Width = self.width // 8 +1
         Height = self.height
         self.send_command(0x24)
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
+        self.send_data2(image[0:Width * Height])
         self.TurnOnDisplay_Fast()
         
     def display_Base(self, image):
@@ -379,14 +358,10 @@ class EPD:
             Width = self.width // 8 +1
         Height = self.height
         self.send_command(0x24)   #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
+        self.send_data2(image[0:Width * Height])
                 
         self.send_command(0x26)  #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(image[i + j * Width])
+        self.send_data2(image[0:Width * Height])
         self.TurnOnDisplay()
         
     def display_Base_color(self, color):
@@ -396,65 +371,62 @@ class EPD:
             Width = self.width // 8 +1
         Height = self.height
         self.send_command(0x24)   #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        self.send_data2([color] * (Width * Height))
                 
         self.send_command(0x26)  #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        self.send_data2([color] * (Width * Height))
         # self.TurnOnDisplay()
     
     def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
-        if((Xstart % 8 + Xend % 8 == 8 & Xstart % 8 > Xend % 8) | Xstart % 8 + Xend % 8 == 0 | (Xend - Xstart)%8 == 0):
-            Xstart = Xstart // 8
-            Xend = Xend // 8
-        else:
-            Xstart = Xstart // 8 
-            if Xend % 8 == 0:
-                Xend = Xend // 8
-            else:
-                Xend = Xend // 8 + 1
-                
+        self.display_Partial_Windows(Image, [(Xstart, Ystart, Xend, Yend)])
+
+    # Writes each (Xstart, Ystart, Xend, Yend) window of the frame to RAM and refreshes the panel once
+    def display_Partial_Windows(self, Image, windows):
         if(self.width % 8 == 0):
             Width = self.width // 8
         else:
             Width = self.width // 8 +1
         Height = self.height
 
-        Xend -= 1
-        Yend -= 1
-        
         # Reset
         self.reset()
 
         self.send_command(0x3C) #BorderWavefrom
         self.send_data(0x80)
-	
-        self.send_command(0x44)       # set RAM x address start/end, in page 35
-        self.send_data(Xstart & 0xff)    # RAM x address start at 00h;
-        self.send_data(Xend & 0xff)    # RAM x address end at 0fh(15+1)*8->128 
-        self.send_command(0x45)       # set RAM y address start/end, in page 35
-        self.send_data(Ystart & 0xff)    # RAM y address start at 0127h;
-        self.send_data((Ystart>>8) & 0x01)    # RAM y address start at 0127h;
-        self.send_data(Yend & 0xff)    # RAM y address end at 00h;
-        self.send_data((Yend>>8) & 0x01)   
-
-        self.send_command(0x4E)   # set RAM x address count to 0;
-        self.send_data(Xstart & 0xff)
-        self.send_command(0x4F)   # set RAM y address count to 0X127;    
-        self.send_data(Ystart & 0xff)
-        self.send_data((Ystart>>8) & 0x01)
 
-        self.send_command(0x24)   #Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                if((j > Ystart-1) & (j < (Yend + 1)) & (i > Xstart-1) & (i < (Xend + 1))):
-                    self.send_data(Image[i + j * Width])
+        for Xstart, Ystart, Xend, Yend in windows:
+            # X is addressed in bytes: widen the window to the enclosing byte boundaries
+            Xstart = max(Xstart, 0) // 8
+            Xend = min((Xend + 7) // 8, Width) - 1
+            Ystart = max(Ystart, 0)
+            Yend = min(Yend, Height) - 1
+            if Xend < Xstart or Yend < Ystart:
+                continue
+
+            self.send_command(0x44)       # set RAM x address start/end, in page 35
+            self.send_data(Xstart & 0xff)    # RAM x address start at 00h;
+            self.send_data(Xend & 0xff)    # RAM x address end at 0fh(15+1)*8->128 
+            self.send_command(0x45)       # set RAM y address start/end, in page 35
+            self.send_data(Ystart & 0xff)    # RAM y address start at 0127h;
+            self.send_data((Ystart>>8) & 0x01)    # RAM y address start at 0127h;
+            self.send_data(Yend & 0xff)    # RAM y address end at 00h;
+            self.send_data((Yend>>8) & 0x01)   
+
+            self.send_command(0x4E)   # set RAM x address count to 0;
+            self.send_data(Xstart & 0xff)
+            self.send_command(0x4F)   # set RAM y address count to 0X127;    
+            self.send_data(Ystart & 0xff)
+            self.send_data((Ystart>>8) & 0x01)
+
+            self.send_command(0x24)   #Write Black and White image to RAM
+            window = bytearray()
+            for j in range(Ystart, Yend + 1):
+                window += bytes(Image[Xstart + j * Width:Xend + 1 + j * Width])
+            self.send_data2(window)
         self.TurnOnDisplay_Partial()
   
     def display_4Gray(self, image):
+        buf = bytearray(5808)
         self.send_command(0x24)
         for i in range(0, 5808):                     #5808*4  46464
             temp3=0
@@ -485,9 +457,11 @@ class EPD:
                     if(j!=1 or k!=1):				
                         temp3 <<= 1
                     temp1 <<= 2
-            self.send_data(temp3)
+            buf[i] = temp3
+        self.send_data2(buf)
             
         self.send_command(0x26)	       
+        buf = bytearray(5808)
         for i in range(0, 5808):                #5808*4  46464
             temp3=0
             for j in range(0, 2):
@@ -517,7 +491,8 @@ class EPD:
                     if(j!=1 or k!=1):					
                         temp3 <<= 1
                     temp1 <<= 2
-            self.send_data(temp3)
+            buf[i] = temp3
+        self.send_data2(buf)
         
         self.TurnOnDisplay_4GRAY()
 
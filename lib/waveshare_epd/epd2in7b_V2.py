@@ -29,12 +29,16 @@
 
 
 import logging
+from PIL import Image
 from . import epdconfig
 
 # Display resolution
 EPD_WIDTH       = 176
 EPD_HEIGHT      = 264
 
+# spidev transfer buffer size (/sys/module/spidev/parameters/bufsiz defaults to 4096)
+SPI_MAX_CHUNK_SIZE = 4096
+
 logger = logging.getLogger(__name__)
 
 class EPD:
@@ -73,7 +77,8 @@ class EPD:
     def send_data2(self, data):
         epdconfig.digital_write(self.dc_pin, 1)
         epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
+        for offset in range(0, len(data), SPI_MAX_CHUNK_SIZE):
+            epdconfig.spi_writebyte2(data[offset:offset + SPI_MAX_CHUNK_SIZE])
         epdconfig.digital_write(self.cs_pin, 1)
         
     # Read Busy
@@ -128,27 +133,19 @@ class EPD:
 
     def getbuffer(self, image):
         # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
         image_monocolor = image.convert('1')
         imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
         # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
         if(imwidth == self.width and imheight == self.height):
             logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
         elif(imwidth == self.height and imheight == self.width):
             logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+            # Rotating by 90 degrees maps (x, y) to (y, height - x - 1), the panel RAM layout
+            image_monocolor = image_monocolor.transpose(Image.ROTATE_90)
+        else:
+            return bytearray([0xFF] * (int(self.width/8) * self.height))
+        # Mode '1' packs 8 pixels per byte, MSB first, with black pixels as cleared bits
+        return bytearray(image_monocolor.tobytes())
     
     # Sends the image buffer in RAM to e-Paper and displays
     def display(self, imageblack, imagered):
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding:utf-8 -*-
+
+# Fails when the monitor client import path pulls in heavy modules or gets slower than the budget.
+# The client is started over SSH on every node for every stats sweep, so its startup cost adds up.
+#
+#   python scripts/check_import_time.py [--budget-ms 50] [--runs 5]
+
+import argparse
+import os
+import subprocess
+import sys
+
+CLIENT_MODULE = 'cluster_monitor.MonitorClient'
+# Third party and display-only modules that must never be imported by the client
+FORBIDDEN_MODULES = ['yaml', 'PIL', 'docker', 'paramiko', 'gpiozero', 'natsort', 'waveshare_epd',
+                     'cluster_monitor.renderers', 'cluster_monitor.helpers.YamlHelper',
+                     'cluster_monitor.helpers.TimeSeriesStore', 'cluster_monitor.helpers.LogTailReader',
+                     'cluster_monitor.helpers.LogRingBufferHandler', 'cluster_monitor.dto.Widget',
+                     'cluster_monitor.dto.MetricsSnapshot', 'cluster_monitor.dto.DockerStatus',
+                     'cluster_monitor.dto.AsyncCommand', 'cluster_monitor.dto.AsyncCommandCache',
+                     'cluster_monitor.ClusterMonitor']
+# About 33 ms measured on a desktop CPU plus headroom, pass a larger budget on slower boards
+DEFAULT_BUDGET_MS = 50
+# Import times are noisy, the fastest of a few runs is compared against the budget
+DEFAULT_RUNS = 5
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+def get_import_times(module: str) -> dict[str, int]:
+    """Returns the cumulative import time in microseconds of every module imported by `import module`."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                             cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    import_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = [field.strip() for field in line[len('import time:'):].split('|')]
+        if fields[1].isdigit():
+            import_times[fields[2]] = int(fields[1])
+    return import_times
+
+def is_forbidden(module: str) -> bool:
+    return any(module == forbidden or module.startswith(f"{forbidden}.") for forbidden in FORBIDDEN_MODULES)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Check the monitor client import time')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Maximum cumulative import time of the monitor client in milliseconds')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS,
+                        help='Number of imports to measure, the fastest one is checked')
+    args = parser.parse_args()
+
+    import_times = min((get_import_times(CLIENT_MODULE) for _ in range(max(args.runs, 1))),
+                       key=lambda times: times[CLIENT_MODULE])
+    forbidden_modules = sorted(module for module in import_times if is_forbidden(module))
+    client_time_ms = import_times[CLIENT_MODULE] / 1000
+
+    print(f"{CLIENT_MODULE} imported in {client_time_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if forbidden_modules:
+        print(f"FAIL: forbidden modules imported: {', '.join(forbidden_modules)}")
+    if client_time_ms > args.budget_ms:
+        print("FAIL: import time budget exceeded")
+    return 1 if forbidden_modules or client_time_ms > args.budget_ms else 0
+
+if __name__ == "__main__":
+    sys.exit(main())